@@ -0,0 +1,167 @@
+import json
+import os
+import re
+
+# データディレクトリを取得
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# 生成元の英語名データと生成したエイリアス索引
+english_names_path = os.path.join(data_dir, 'mhwilds_english_names.json')
+aliases_path = os.path.join(data_dir, 'mhwilds_aliases.json')
+
+# エイリアスの種類（context_handler の KIND_MONSTER / KIND_SKILL と同じ値）
+KIND_MONSTER = "monster"
+KIND_SKILL = "skill"
+
+# カタカナ→ローマ字（ヘボン式）の変換表
+# 2文字の組み合わせ（拗音・外来音）を先に調べる
+KANA_DIGRAPHS = {
+    "キャ": "kya", "キュ": "kyu", "キョ": "kyo", "ギャ": "gya", "ギュ": "gyu", "ギョ": "gyo",
+    "シャ": "sha", "シュ": "shu", "ショ": "sho", "シェ": "she", "ジャ": "ja", "ジュ": "ju", "ジョ": "jo", "ジェ": "je",
+    "チャ": "cha", "チュ": "chu", "チョ": "cho", "チェ": "che", "ニャ": "nya", "ニュ": "nyu", "ニョ": "nyo",
+    "ヒャ": "hya", "ヒュ": "hyu", "ヒョ": "hyo", "ビャ": "bya", "ビュ": "byu", "ビョ": "byo",
+    "ピャ": "pya", "ピュ": "pyu", "ピョ": "pyo", "ミャ": "mya", "ミュ": "myu", "ミョ": "myo",
+    "リャ": "rya", "リュ": "ryu", "リョ": "ryo",
+    "ティ": "ti", "ディ": "di", "トゥ": "tu", "ドゥ": "du", "ファ": "fa", "フィ": "fi", "フェ": "fe", "フォ": "fo",
+    "ウィ": "wi", "ウェ": "we", "ウォ": "wo", "ヴァ": "va", "ヴィ": "vi", "ヴェ": "ve", "ヴォ": "vo",
+    "イャ": "iya", "デュ": "dyu", "テュ": "tyu",
+}
+KANA = {
+    "ア": "a", "イ": "i", "ウ": "u", "エ": "e", "オ": "o",
+    "カ": "ka", "キ": "ki", "ク": "ku", "ケ": "ke", "コ": "ko", "ガ": "ga", "ギ": "gi", "グ": "gu", "ゲ": "ge", "ゴ": "go",
+    "サ": "sa", "シ": "shi", "ス": "su", "セ": "se", "ソ": "so", "ザ": "za", "ジ": "ji", "ズ": "zu", "ゼ": "ze", "ゾ": "zo",
+    "タ": "ta", "チ": "chi", "ツ": "tsu", "テ": "te", "ト": "to", "ダ": "da", "ヂ": "ji", "ヅ": "zu", "デ": "de", "ド": "do",
+    "ナ": "na", "ニ": "ni", "ヌ": "nu", "ネ": "ne", "ノ": "no",
+    "ハ": "ha", "ヒ": "hi", "フ": "fu", "ヘ": "he", "ホ": "ho", "バ": "ba", "ビ": "bi", "ブ": "bu", "ベ": "be", "ボ": "bo",
+    "パ": "pa", "ピ": "pi", "プ": "pu", "ペ": "pe", "ポ": "po",
+    "マ": "ma", "ミ": "mi", "ム": "mu", "メ": "me", "モ": "mo",
+    "ヤ": "ya", "ユ": "yu", "ヨ": "yo", "ラ": "ra", "リ": "ri", "ル": "ru", "レ": "re", "ロ": "ro",
+    "ワ": "wa", "ヲ": "wo", "ン": "n", "ヴ": "vu",
+    "ァ": "a", "ィ": "i", "ゥ": "u", "ェ": "e", "ォ": "o", "ャ": "ya", "ュ": "yu", "ョ": "yo",
+}
+# 名前に含まれる漢字の読み
+KANJI_READINGS = {"護竜": "goryu ", "亜種": " ashu"}
+
+def normalize_alias(text):
+    """
+    エイリアス検索用に正規化する（大文字小文字・空白・記号の違いを吸収）
+    """
+    return re.sub(r"[\s\-_'/・.　]+", "", text.casefold())
+
+def katakana_to_romaji(name, long_vowel=True):
+    """
+    カタカナの名前をローマ字に変換する（変換できない文字を含む場合は None）
+    long_vowel が True なら長音「ー」は直前の母音を重ね、False なら省略する
+    """
+    for kanji, reading in KANJI_READINGS.items():
+        name = name.replace(kanji, reading)
+    
+    result = ""
+    i = 0
+    while i < len(name):
+        char = name[i]
+        digraph = name[i:i + 2]
+        if digraph in KANA_DIGRAPHS:
+            result += KANA_DIGRAPHS[digraph]
+            i += 2
+        elif char == "ッ":
+            # 促音は次の子音を重ねる
+            following = katakana_to_romaji(name[i + 1:i + 3]) or ""
+            result += following[:1] if following[:1] not in "aiueo" else ""
+            i += 1
+        elif char == "ー":
+            if long_vowel and result and result[-1] in "aiueo":
+                result += result[-1]
+            i += 1
+        elif char in KANA:
+            result += KANA[char]
+            i += 1
+        elif char in " ・":
+            result += " "
+            i += 1
+        elif char.isascii():
+            result += char
+            i += 1
+        else:
+            return None
+    return result.strip()
+
+def kana_aliases(name):
+    """
+    正式名から表記ゆれのエイリアス（"・"を除去、"亜種"を除去）を生成する
+    app.py の MONSTER_ALIASES とエイリアス索引の両方がこの規則を使う
+    """
+    aliases = []
+    if "・" in name:
+        aliases.append(name.replace("・", ""))
+    if "亜種" in name:
+        aliases.append(name.replace("亜種", ""))
+    return aliases
+
+def generate_aliases(canonical_names, english_names):
+    """
+    正式名からローマ字・英語名のエイリアスを生成し {正規化したエイリアス: 正式名} で返す
+    """
+    aliases = {}
+    for name in canonical_names:
+        candidates = [english_names.get(name)]
+        # 表記ゆれのエイリアスもローマ字にする
+        for base in dict.fromkeys([name] + kana_aliases(name)):
+            candidates += [katakana_to_romaji(base), katakana_to_romaji(base, long_vowel=False)]
+        for candidate in candidates:
+            if candidate:
+                aliases.setdefault(normalize_alias(candidate), name)
+    return aliases
+
+def build_alias_index(monster_names, skill_names):
+    """
+    モンスター名・スキル名のエイリアス索引を生成して data/mhwilds_aliases.json に保存する
+    """
+    with open(english_names_path, 'r', encoding='utf-8') as f:
+        english_names = json.load(f)
+    
+    index = {
+        "モンスター": generate_aliases(monster_names, english_names.get("モンスター", {})),
+        "スキル": generate_aliases(skill_names, english_names.get("スキル", {})),
+    }
+    with open(aliases_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    return index
+
+def load_alias_index():
+    """
+    保存済みのエイリアス索引を {正規化したエイリアス: (種類, 正式名)} で返す
+    モンスターとスキルで重なる場合はモンスターを優先する
+    """
+    try:
+        with open(aliases_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        # setup.py で生成する前
+        return {}
+    except Exception as e:
+        print(f"エイリアス索引読み込みエラー: {e}")
+        return {}
+    
+    lookup = {alias: (KIND_SKILL, name) for alias, name in index.get("スキル", {}).items()}
+    lookup.update({alias: (KIND_MONSTER, name) for alias, name in index.get("モンスター", {}).items()})
+    return lookup
+
+# エイリアス索引（読み込み時に1回だけ作成）
+alias_lookup = load_alias_index()
+
+def lookup_alias(text):
+    """
+    ローマ字・英語名から (種類, 正式名) を返す（見つからなければ None）
+    """
+    return alias_lookup.get(normalize_alias(text))
+
+def lookup_monster_alias(text):
+    """
+    ローマ字・英語名からモンスターの正式名を返す（モンスターでなければ None）
+    """
+    entry = lookup_alias(text)
+    if entry and entry[0] == KIND_MONSTER:
+        return entry[1]
+    return None
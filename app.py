@@ -1,10 +1,18 @@
+import hmac
 import json
 import os
 import re
+import threading
 from flask import Flask, request, abort, jsonify
-from linebot import LineBotApi, WebhookHandler
-from linebot.exceptions import InvalidSignatureError
-from linebot.models import MessageEvent, TextMessage, TextSendMessage
+import startup_profile
+from monster_handler import recommend_elements, recommend_elements_for_tempered_level, best_element
+import skills_handler
+from skills_handler import search_skill_decorations
+from context_handler import remember, recall, KIND_MONSTER, KIND_SKILL
+from notification_handler import subscribe, unsubscribe
+from alias_index import kana_aliases, lookup_alias, lookup_monster_alias
+from cache_handler import cached_reply, mark_event_processed, unmark_event_processed, cache_stats
+from flex_handler import FLEX_NOT_SENT, flex_enabled, send_flex_message, weakness_cards, tempered_cards, tempered_level_cards, skill_cards
 
 # 以下の行を必ず保持してください - gunicornはこの変数を探します
 app = Flask(__name__)
@@ -34,23 +42,60 @@ MONSTER_ALIASES = {
     "護竜アンジャナフ": "護竜アンジャナフ亜種"
 }
 
+def build_monster_aliases():
+    """
+    手動定義のエイリアスに自動生成したエイリアスを追加する
+    """
+    additional_aliases = {}
+    for name in MONSTER_NAMES:
+        # "・"や"亜種"を除去したエイリアスを追加（エイリアス索引のローマ字と同じ規則）
+        for alias in kana_aliases(name):
+            if alias not in MONSTER_ALIASES and alias not in MONSTER_NAMES:
+                additional_aliases[alias] = name
+    
+    # 手動定義したエイリアスを優先しつつ追加エイリアスを統合
+    MONSTER_ALIASES.update(additional_aliases)
+
 # 自動的にエイリアスをさらに生成する
-additional_aliases = {}
-for name in MONSTER_NAMES:
-    # "・"を含む名前には、"・"を除去したエイリアスを追加
-    if "・" in name:
-        alias = name.replace("・", "")
-        if alias not in MONSTER_ALIASES and alias not in MONSTER_NAMES:
-            additional_aliases[alias] = name
-    
-    # "亜種"を含む名前には、"亜種"を除去したエイリアスを追加
-    if "亜種" in name:
-        alias = name.replace("亜種", "")
-        if alias not in MONSTER_ALIASES and alias not in MONSTER_NAMES:
-            additional_aliases[alias] = name
-
-# 手動定義したエイリアスを優先しつつ追加エイリアスを統合
-MONSTER_ALIASES.update(additional_aliases)
+with startup_profile.stage("モンスター名エイリアス生成"):
+    build_monster_aliases()
+
+# 属性おすすめで1体のモンスター名として扱う最大の単語数（英語名は「gore magala」のように複数の単語になる）
+MAX_ALIAS_WORDS = 4
+
+def resolve_monster_name(name):
+    """
+    モンスター名・エイリアス・ローマ字・英語名から正式名を返す（見つからなければ None）
+    """
+    if name in MONSTER_NAMES:
+        return name
+    actual_name = MONSTER_ALIASES.get(name)
+    if actual_name in MONSTER_NAMES:
+        return actual_name
+    actual_name = lookup_monster_alias(name)
+    if actual_name in MONSTER_NAMES:
+        return actual_name
+    return None
+
+def resolve_monster_names(words):
+    """
+    スペースで区切られた単語の並びをモンスターの正式名の一覧に変換する
+    複数の単語からなる英語名に対応するため、先頭からできるだけ長くつなげた名前を優先する
+    見つからない単語はそのまま残す（おすすめの返信で見つからなかった名前として表示される）
+    """
+    names = []
+    start = 0
+    while start < len(words):
+        for end in range(min(len(words), start + MAX_ALIAS_WORDS), start, -1):
+            actual_name = resolve_monster_name(" ".join(words[start:end]))
+            if actual_name:
+                names.append(actual_name)
+                start = end
+                break
+        else:
+            names.append(words[start])
+            start += 1
+    return names
 
 # 属性リスト
 ELEMENTS = ["火", "水", "雷", "氷", "龍"]
@@ -68,25 +113,122 @@ def index():
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-# LINE API情報を環境変数から取得
-line_bot_api = LineBotApi(os.environ.get('LINE_CHANNEL_ACCESS_TOKEN'))
-handler = WebhookHandler(os.environ.get('LINE_CHANNEL_SECRET'))
+# キャッシュの利用状況（ヒット率など）
+# 公開されたWebのdynoで誰でも見られないよう、METRICS_TOKEN を設定した場合のみ
+# 「Authorization: Bearer <METRICS_TOKEN>」付きのリクエストに返す（未設定なら404）
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+@app.route('/metrics/cache')
+def cache_metrics():
+    if not METRICS_TOKEN:
+        abort(404)
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization.encode('utf-8'), f"Bearer {METRICS_TOKEN}".encode('utf-8')):
+        abort(401)
+    return jsonify(cache_stats())
+
+# LINE SDKは読み込みが重いため、最初に使うとき（または warm_up）まで初期化しない
+line_bot_api = None
+handler = None
+line_bot_lock = threading.Lock()
+
+def get_line_bot_api():
+    """
+    LINE APIクライアントを返す（初回のみ作成）
+    """
+    global line_bot_api
+    if line_bot_api is None:
+        with line_bot_lock:
+            if line_bot_api is None:
+                with startup_profile.stage("LineBotApi初期化"):
+                    from linebot import LineBotApi
+                    # LINE API情報を環境変数から取得
+                    line_bot_api = LineBotApi(
+                        os.environ.get('LINE_CHANNEL_ACCESS_TOKEN'),
+                        endpoint=os.environ.get('LINE_API_ENDPOINT', 'https://api.line.me'),
+                    )
+    return line_bot_api
+
+def get_webhook_handler():
+    """
+    Webhookハンドラーを返す（初回のみ作成してメッセージハンドラーを登録）
+    """
+    global handler
+    if handler is None:
+        with line_bot_lock:
+            if handler is None:
+                with startup_profile.stage("WebhookHandler初期化"):
+                    from linebot import WebhookHandler
+                    from linebot.models import MessageEvent, TextMessage
+                    webhook_handler = WebhookHandler(os.environ.get('LINE_CHANNEL_SECRET'))
+                    webhook_handler.add(MessageEvent, message=TextMessage)(handle_message)
+                    handler = webhook_handler
+    return handler
+
+def send_text_message(reply_token, text):
+    """
+    テキストメッセージで返信する
+    """
+    from linebot.models import TextSendMessage
+    get_line_bot_api().reply_message(reply_token, TextSendMessage(text=text))
+
+def send_card_message(reply_token, card, text):
+    """
+    組み立て済みのFlexカードがあればそのまま送信し、なければ（LINEに拒否されたら）テキストで返信する
+    タイムアウトなどで届いたか分からない場合は、reply tokenが使用済みかもしれないのでテキストは送らない
+    """
+    if flex_enabled and card:
+        status = send_flex_message(reply_token, card)
+        if status != FLEX_NOT_SENT:
+            return
+    send_text_message(reply_token, text)
+
+def warm_up():
+    """
+    LINE SDKの読み込みと初期化、検索処理の初回実行を済ませておく
+    gunicornのワーカー起動時（gunicorn.conf.py の post_worker_init）に呼ばれ、最初のWebhookが遅くならないようにする
+    """
+    get_line_bot_api()
+    get_webhook_handler()
+    with startup_profile.stage("linebot.models読み込み"):
+        import linebot.models
+        import linebot.exceptions
+    with startup_profile.stage("検索処理の初回実行"):
+        search_skill("攻撃")
+        search_monster_weakness(MONSTER_NAMES[0])
+        search_tempered_monster(MONSTER_NAMES[0])
+        search_by_weakness(ELEMENTS[0] + "属性")
+        search_tempered_monsters(1)
 
 @app.route("/callback", methods=['POST'])
 def callback():
+    from linebot.exceptions import InvalidSignatureError
+    
     # 署名検証
     signature = request.headers['X-Line-Signature']
     body = request.get_data(as_text=True)
     
     try:
-        handler.handle(body, signature)
+        get_webhook_handler().handle(body, signature)
     except InvalidSignatureError:
         abort(400)
     
     return 'OK'
 
-@handler.add(MessageEvent, message=TextMessage)
 def handle_message(event):
+    # 再送されたイベントは、他のワーカーで処理済みの場合も含めて処理しない
+    event_id = getattr(event, 'webhook_event_id', None)
+    if not mark_event_processed(event_id):
+        return
+    
+    try:
+        reply_to_message(event)
+    except Exception:
+        # 返信できなかったイベントは、再送されたときに処理し直す
+        unmark_event_processed(event_id)
+        raise
+
+def reply_to_message(event):
     text = event.message.text
     reply_token = event.reply_token
     
@@ -99,16 +241,22 @@ def handle_message(event):
     
     # 弱点検索: 「弱点:チャタカブラ」のようなパターン
     if text.startswith('弱点:') or text.startswith('弱点：'):
+        # エイリアス・ローマ字・英語名は正式名に変換する（見つからなければそのまま検索して見つからない旨を返す）
         monster_name = text[3:].strip()
+        monster_name = resolve_monster_name(monster_name) or monster_name
         result = search_monster_weakness(monster_name)
-        line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+        remember_monster(event, monster_name)
+        send_card_message(reply_token, weakness_cards.get(monster_name), result)
         return
         
     # 歴戦検索: 「歴戦:リオレウス」のようなパターン
     if text.startswith('歴戦:') or text.startswith('歴戦：'):
+        # エイリアス・ローマ字・英語名は正式名に変換する（見つからなければそのまま検索して見つからない旨を返す）
         monster_name = text[3:].strip()
+        monster_name = resolve_monster_name(monster_name) or monster_name
         result = search_tempered_monster(monster_name)
-        line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+        remember_monster(event, monster_name)
+        send_card_message(reply_token, tempered_cards.get(monster_name), result)
         return
     
     # 2. 単一ワードの場合はマッチングを試みる
@@ -116,14 +264,25 @@ def handle_message(event):
     # モンスター名が直接入力された場合 (リストに存在する場合のみ)
     if text in MONSTER_NAMES:
         result = search_monster_weakness(text)
-        line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+        remember_monster(event, text)
+        send_card_message(reply_token, weakness_cards.get(text), result)
         return
     
-    # モンスター名のエイリアス処理
-    normalized_monster_name = MONSTER_ALIASES.get(text)
-    if normalized_monster_name and normalized_monster_name in MONSTER_NAMES:
+    # モンスター名のエイリアス・ローマ字・英語名の処理（例: ゴアマガラ、rathalos、gore magala）
+    normalized_monster_name = resolve_monster_name(text)
+    if normalized_monster_name:
         result = search_monster_weakness(normalized_monster_name)
-        line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+        remember_monster(event, normalized_monster_name)
+        send_card_message(reply_token, weakness_cards.get(normalized_monster_name), result)
+        return
+    
+    # スキルのローマ字・英語名の処理（例: weakness exploit）
+    alias_entry = lookup_alias(text)
+    if alias_entry and alias_entry[0] == KIND_SKILL:
+        name = alias_entry[1]
+        result = search_skill(name)
+        remember(getattr(event.source, 'user_id', None), KIND_SKILL, name)
+        send_card_message(reply_token, skill_cards.get(name), result)
         return
     
     # 3. 特定のパターンでの検索
@@ -137,7 +296,7 @@ def handle_message(event):
         for element in ELEMENTS:
             if element_text == element or element_text == element + "属性":
                 result = search_by_weakness(element + "属性")
-                line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+                send_text_message(reply_token, result)
                 return
     
     # 属性 弱点のパターン
@@ -148,16 +307,47 @@ def handle_message(event):
             normalized_text == element + "属性弱点" or 
             normalized_text == element + "弱点"):
             result = search_by_weakness(element + "属性")
-            line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+            send_text_message(reply_token, result)
             return
     
+    # 歴戦モンスター通知: 「通知オン」「通知オン 3」「通知オフ」
+    if normalized_text.startswith('通知オン'):
+        # 危険度は1〜3の数字のみ（「通知オン 2 3」「通知オン 2,3」も可）。省略時は全危険度
+        level_text = re.sub(r"[\s,、]+", "", normalized_text[4:])
+        if level_text and not all(c in '123' for c in level_text):
+            send_text_message(reply_token, "危険度は1〜3の数字で指定してニャ。\n例: 通知オン（全危険度）、通知オン 3、通知オン 2 3")
+            return
+        levels = [int(c) for c in level_text]
+        user_id = getattr(event.source, 'user_id', None)
+        result = subscribe(user_id, sorted(set(levels)))
+        send_text_message(reply_token, result)
+        return
+    
+    if normalized_text == '通知オフ':
+        user_id = getattr(event.source, 'user_id', None)
+        result = unsubscribe(user_id)
+        send_text_message(reply_token, result)
+        return
+    
+    # 属性おすすめ: 「属性おすすめ リオレウス ゴア・マガラ」「属性おすすめ 歴戦3」のようなパターン
+    if normalized_text.startswith('属性おすすめ'):
+        targets = normalized_text[len('属性おすすめ'):].split()
+        level_text = "".join(targets)
+        if level_text in ['歴戦1', '歴戦2', '歴戦3']:
+            result = recommend_elements_for_tempered_level(int(level_text[2]))
+        else:
+            # エイリアス・英語名を正式名に変換してから検索
+            result = recommend_elements(resolve_monster_names(targets))
+        send_text_message(reply_token, result)
+        return
+    
     # 歴戦 1, 歴戦 2, 歴戦 3のパターン
     if normalized_text.startswith('歴戦 ') and len(normalized_text) >= 4:
         level_text = normalized_text[3]
         if level_text in ['1', '2', '3']:
             level = int(level_text)
             result = search_tempered_monsters(level)
-            line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+            send_card_message(reply_token, tempered_level_cards.get(level), result)
             return
     
     # 歴戦 モンスター名のパターン
@@ -167,43 +357,99 @@ def handle_message(event):
         for name in MONSTER_NAMES:
             if monster_name == name:
                 result = search_tempered_monster(monster_name)
-                line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+                remember_monster(event, monster_name)
+                send_card_message(reply_token, tempered_cards.get(monster_name), result)
                 return
         
-        # エイリアスのチェック
-        normalized_monster_name = MONSTER_ALIASES.get(monster_name)
-        if normalized_monster_name and normalized_monster_name in MONSTER_NAMES:
+        # エイリアス・ローマ字・英語名のチェック
+        normalized_monster_name = resolve_monster_name(monster_name)
+        if normalized_monster_name:
             result = search_tempered_monster(normalized_monster_name)
-            line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+            remember_monster(event, normalized_monster_name)
+            send_card_message(reply_token, tempered_cards.get(normalized_monster_name), result)
             return
     
     # モンスター名 弱点のパターン
     for name in MONSTER_NAMES:
         if normalized_text == name + " 弱点" or normalized_text == name + "弱点":
             result = search_monster_weakness(name)
-            line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+            remember_monster(event, name)
+            send_card_message(reply_token, weakness_cards.get(name), result)
             return
     
-    # モンスター名のエイリアス + 弱点のパターン
-    for alias, actual_name in MONSTER_ALIASES.items():
-        if normalized_text == alias + " 弱点" or normalized_text == alias + "弱点":
+    # モンスター名のエイリアス・ローマ字・英語名 + 弱点のパターン（例: ゴアマガラ弱点、gore magala 弱点）
+    if normalized_text.endswith('弱点'):
+        actual_name = resolve_monster_name(normalized_text[:-len('弱点')].strip())
+        if actual_name:
             result = search_monster_weakness(actual_name)
-            line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+            remember_monster(event, actual_name)
+            send_card_message(reply_token, weakness_cards.get(actual_name), result)
             return
     
+    # 直前に検索したモンスター・スキルへの追加の質問: 「歴戦は？」「弱点は？」「装飾品は？」
+    user_id = getattr(event.source, 'user_id', None)
+    result = answer_follow_up(normalized_text, recall(user_id))
+    if result:
+        send_text_message(reply_token, result)
+        return
+    
     # 上記のどのパターンにも一致しない場合はスキル検索
-    result = search_skill(text)
-    line_bot_api.reply_message(reply_token, TextSendMessage(text=result))
+    # カードを選ぶためにスキル自体も必要なので、検索は1回で済ませて返信テキストも一緒に受け取る
+    skill, result = lookup_skill(text)
+    if skill:
+        remember(user_id, KIND_SKILL, skill.name)
+        send_card_message(reply_token, skill_cards.get(skill.name), result)
+        return
+    send_text_message(reply_token, result)
+
+def remember_monster(event, monster_name):
+    """
+    直前に検索したモンスターとして記録する（正式名に解決できる場合のみ）
+    """
+    name = resolve_monster_name(monster_name)
+    if name:
+        remember(getattr(event.source, 'user_id', None), KIND_MONSTER, name)
+
+def answer_follow_up(text, context):
+    """
+    直前に検索したモンスター・スキルに対する追加の質問に答える（該当しなければ None）
+    """
+    if not context:
+        return None
+    
+    # 「歴戦は？」「装飾品は?」「弱点」などを意図に変換
+    intent = text.strip().rstrip('？?').strip()
+    if intent.endswith('は'):
+        intent = intent[:-1]
+    
+    kind, name = context
+    if kind == KIND_MONSTER:
+        if intent == '歴戦':
+            return search_tempered_monster(name)
+        if intent == '弱点':
+            return search_monster_weakness(name)
+        if intent == '装飾品':
+            # 一番効く属性の属性強化スキルの装飾品を案内する
+            element = best_element(name)
+            if element:
+                return f"{name}には{element}が効果的ニャ！\n" + search_skill_decorations(element + "強化")
+    elif kind == KIND_SKILL:
+        if intent == '装飾品':
+            return search_skill_decorations(name)
+        if intent in ['装備', '防具', 'スキル']:
+            return search_skill(name)
+    
+    return None
 
 def send_help_message(reply_token):
     help_text = """【モンハンワイルズ情報検索ボット】
 
 ■ 使い方
 ・スキル/装飾品検索: スキル名や装飾品名を入力
- 例: 攻撃、見切り、匠珠、アイテム、火属性
+ 例: 攻撃、見切り、匠珠、アイテム、火属性、weakness exploit
 
 ・モンスター弱点検索: モンスター名を入力
- 例: チャタカブラ、リオレウス
+ 例: チャタカブラ、リオレウス、rathalos、gore magala
  または「弱点:モンスター名」と入力
 
 ・属性弱点検索: 属性＋弱点の組み合わせで入力
@@ -213,127 +459,51 @@ def send_help_message(reply_token):
  例: 歴戦 1、歴戦 3
  または「歴戦 モンスター名」と入力
 
+・属性おすすめ: 「属性おすすめ モンスター名 モンスター名…」と入力
+ 例: 属性おすすめ リオレウス ゴア・マガラ タマミツネ
+ または「属性おすすめ 歴戦3」で危険度ごとにまとめておすすめ
+
+・歴戦モンスター通知: 「通知オン」で歴戦の個体情報を受け取る
+ 例: 通知オン、通知オン 3（危険度3のみ）、通知オフ
+
+・続けて質問: モンスター名やスキル名のあとに「歴戦は？」「弱点は？」「装飾品は？」
+
 ※「ヘルプ」と入力するといつでもこの使い方が表示されるニャ！"""
 
-    line_bot_api.reply_message(
-        reply_token,
-        TextSendMessage(text=help_text)
-    )
+    send_text_message(reply_token, help_text)
+
+# 検索に失敗したときの返信（キャッシュしない）
+SKILL_ERROR_REPLY = "ごめんニャ、検索中にエラーが発生したニャ。"
+WEAKNESS_ERROR_REPLY = "モンスター弱点情報の検索中にエラーが発生したニャ。"
+BY_WEAKNESS_ERROR_REPLY = "属性弱点の検索中にエラーが発生したニャ。"
+TEMPERED_LEVEL_ERROR_REPLY = "歴戦モンスターの検索中にエラーが発生したニャ。"
+TEMPERED_ERROR_REPLY = "歴戦モンスターデータの検索中にエラーが発生したニャ。"
 
 # スキルデータ検索関数
+@cached_reply("skill", error_reply=SKILL_ERROR_REPLY)
 def search_skill(text):
     """
     スキル名、装飾品名、または防具名から情報を検索
+    （読み込み済みのスキルレコードを使う skills_handler に委譲）
     """
-    if not text:
-        return "検索するスキル名、装飾品名、または防具名を入力してください。"
-    
     try:
-        # スキルデータの読み込み
-        with open(os.path.join(data_dir, 'updated_mhwilds_skills.json'), 'r', encoding='utf-8') as f:
-            skills_data = json.load(f)
-            
-        # 装飾品辞書と装備辞書を作成
-        deco_to_skill = {}
-        armor_to_skill = {}
-        
-        for skill in skills_data:
-            # 装飾品から検索用辞書作成
-            for deco in skill.get("装飾品", []):
-                deco_name = deco.get("装飾品名", "")
-                if deco_name:
-                    deco_to_skill[deco_name] = skill["スキル名"]
-            
-            # 装備から検索用辞書作成
-            for armor in skill.get("装備", []):
-                armor_name = armor.get("防具名", "")
-                if armor_name:
-                    armor_to_skill[armor_name] = skill["スキル名"]
-        
-        # 検索結果
-        result = None
-        search_type = ""
-        
-        # スキル名で検索
-        for skill in skills_data:
-            if text in skill["スキル名"]:
-                result = skill
-                search_type = "スキル名"
-                break
-        
-        # スキル名で見つからなければ装飾品名で検索（部分一致）
-        if not result:
-            matching_decos = [deco for deco in deco_to_skill.keys() if text in deco]
-            if matching_decos:
-                deco_name = matching_decos[0]  # 最初の一致した装飾品を使用
-                skill_name = deco_to_skill[deco_name]
-                for skill in skills_data:
-                    if skill["スキル名"] == skill_name:
-                        result = skill
-                        search_type = f"装飾品「{deco_name}」"
-                        break
-        
-        # 装飾品で見つからなければ装備名で検索（部分一致）
-        if not result:
-            matching_armors = [armor for armor in armor_to_skill.keys() if text in armor]
-            if matching_armors:
-                armor_name = matching_armors[0]  # 最初の一致した防具を使用
-                skill_name = armor_to_skill[armor_name]
-                for skill in skills_data:
-                    if skill["スキル名"] == skill_name:
-                        result = skill
-                        search_type = f"装備「{armor_name}」"
-                        break
-        
-        # 検索結果に応じてメッセージを返信
-        if result:
-            # スキル情報を整形して返信
-            reply_text = f"【{search_type}での検索結果】\n"
-            reply_text += f"スキル名: {result['スキル名']}\n\n"
-            reply_text += f"▼効果\n{result['効果']}\n\n"
-            reply_text += f"▼最大レベル: {result['最大レベル']}\n\n"
-            
-            # レベル別効果がある場合
-            if result["レベル別効果"]:
-                reply_text += "▼レベル別効果\n"
-                for effect in sorted(result["レベル別効果"], key=lambda x: x["レベル"]):
-                    reply_text += f"Lv{effect['レベル']}: {effect['効果']}\n"
-                reply_text += "\n"
-            
-            # 装飾品情報がある場合
-            if result["装飾品"]:
-                reply_text += "▼装飾品\n"
-                for deco in result["装飾品"]:
-                    reply_text += f"・{deco.get('装飾品名', '')} (Lv{deco.get('装飾品Lv', '')})\n"
-                reply_text += "\n"
-            
-            # 装備情報がある場合
-            if "装備" in result and result["装備"]:
-                reply_text += f"▼{result['スキル名']}が発動する装備(レベル/スロット数)\n"
-                
-                # スキルレベルが高い順に並べ替え
-                sorted_armors = sorted(result["装備"], key=lambda x: x.get("スキルレベル", 0), reverse=True)
-                for armor in sorted_armors:  # 全ての装備を表示
-                    # スロット情報の取得
-                    slots = armor.get('スロット', [])
-                    
-                    # スロット情報を含めた表示
-                    if slots:
-                        # スロットの数値をそのまま文字列に変換して表示
-                        slot_str = '/'.join(map(str, slots))
-                        reply_text += f"・{armor.get('防具名', '')} (Lv{armor.get('スキルレベル', '')}/{slot_str})\n"
-                    else:
-                        reply_text += f"・{armor.get('防具名', '')} (Lv{armor.get('スキルレベル', '')})\n"
-            
-            return reply_text
-        else:
-            # 結果が見つからなかった場合
-            return f"ごめんニャ、「{text}」に関する情報が見つかんないニャ。寝不足かもなのニャ…\nスキル名、装飾品名、または防具名を入れてみるニャ！"
+        return skills_handler.search_skill(text)
+    except Exception as e:
+        print(f"スキル検索エラー: {e}")
+        return SKILL_ERROR_REPLY
+
+def lookup_skill(text):
+    """
+    スキルを検索し、(見つかったスキル または None, 返信テキスト) を返す
+    """
+    try:
+        return skills_handler.lookup_skill(text)
     except Exception as e:
         print(f"スキル検索エラー: {e}")
-        return f"ごめんニャ、検索中にエラーが発生したニャ。"
+        return None, SKILL_ERROR_REPLY
 
 # モンスターの弱点を検索
+@cached_reply("weakness", error_reply=WEAKNESS_ERROR_REPLY)
 def search_monster_weakness(monster_name):
     try:
         with open(os.path.join(data_dir, 'mhwilds_weakness.json'), 'r', encoding='utf-8') as f:
@@ -420,9 +590,10 @@ def search_monster_weakness(monster_name):
     
     except Exception as e:
         print(f"モンスター弱点検索エラー: {e}")
-        return "モンスター弱点情報の検索中にエラーが発生したニャ。"
+        return WEAKNESS_ERROR_REPLY
 
 # 属性に弱いモンスターを検索
+@cached_reply("by_weakness", error_reply=BY_WEAKNESS_ERROR_REPLY)
 def search_by_weakness(element):
     try:
         with open(os.path.join(data_dir, 'mhwilds_weakness.json'), 'r', encoding='utf-8') as f:
@@ -457,9 +628,10 @@ def search_by_weakness(element):
     
     except Exception as e:
         print(f"属性弱点検索エラー: {e}")
-        return "属性弱点の検索中にエラーが発生したニャ。"
+        return BY_WEAKNESS_ERROR_REPLY
 
 # 歴戦モンスターを検索
+@cached_reply("tempered_level", error_reply=TEMPERED_LEVEL_ERROR_REPLY)
 def search_tempered_monsters(level):
     try:
         with open(os.path.join(data_dir, 'mhwilds_tempered_monsters.json'), 'r', encoding='utf-8') as f:
@@ -483,9 +655,10 @@ def search_tempered_monsters(level):
     
     except Exception as e:
         print(f"歴戦モンスター検索エラー: {e}")
-        return "歴戦モンスターの検索中にエラーが発生したニャ。"
+        return TEMPERED_LEVEL_ERROR_REPLY
 
 # 特定のモンスターの歴戦データを検索
+@cached_reply("tempered", error_reply=TEMPERED_ERROR_REPLY)
 def search_tempered_monster(monster_name):
     try:
         with open(os.path.join(data_dir, 'mhwilds_tempered_monsters.json'), 'r', encoding='utf-8') as f:
@@ -525,7 +698,7 @@ def search_tempered_monster(monster_name):
     
     except Exception as e:
         print(f"歴戦モンスターデータ検索エラー: {e}")
-        return "歴戦モンスターデータの検索中にエラーが発生したニャ。"
+        return TEMPERED_ERROR_REPLY
 
 # サーバー起動（直接実行する場合のみ）
 if __name__ == "__main__":
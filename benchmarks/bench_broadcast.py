@@ -0,0 +1,151 @@
+# benchmarks/bench_broadcast.py
+"""
+歴戦モンスター通知のブロードキャストをローカルのスタブエンドポイントに対して実行する
+
+使い方:
+  python benchmarks/bench_broadcast.py --subscribers 20000 --fail-rate 0.1
+  python benchmarks/bench_broadcast.py --store redis  # Redisのスタンドインに購読者を保存する
+
+スタブは LINE の multicast API を模倣し、一定割合で429（Retry-After: 0）を返す。
+全購読者にちょうど1回ずつ届いたことを確認し、スループットを表示する。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# リポジトリのルートをPYTHONPATHに追加
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(bench_dir))
+
+import notification_handler  # noqa: E402
+from bench_cache import RedisStandIn  # noqa: E402
+
+
+class StubState:
+    def __init__(self, fail_rate):
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.delivered = {}
+        self.accepted_keys = set()
+        self.requests = 0
+        self.max_body = 0
+
+
+def make_handler(state):
+    class MulticastStub(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            with state.lock:
+                state.requests += 1
+                state.max_body = max(state.max_body, len(body))
+            
+            if self.path != notification_handler.MULTICAST_PATH:
+                self.send_response(404)
+                self.end_headers()
+                return
+            
+            payload = json.loads(body)
+            if len(payload["to"]) > notification_handler.MULTICAST_MAX_RECIPIENTS or not payload["messages"]:
+                self.send_response(400)
+                self.end_headers()
+                return
+            
+            if random.random() < state.fail_rate:
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            
+            retry_key = self.headers.get('X-Line-Retry-Key')
+            with state.lock:
+                if retry_key in state.accepted_keys:
+                    self.send_response(409)
+                    self.end_headers()
+                    return
+                state.accepted_keys.add(retry_key)
+                for user_id in payload["to"]:
+                    state.delivered[user_id] = state.delivered.get(user_id, 0) + 1
+            
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return MulticastStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通知ブロードキャストのベンチマーク")
+    parser.add_argument("--subscribers", type=int, default=20000)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=notification_handler.MAX_CONCURRENCY)
+    parser.add_argument("--store", choices=sorted(notification_handler.SUBSCRIBER_STORES), default="file")
+    args = parser.parse_args()
+    
+    state = StubState(args.fail_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    redis_server = RedisStandIn()
+    threading.Thread(target=redis_server.serve_forever, daemon=True).start()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.store == "redis":
+            store = notification_handler.create_subscriber_store(
+                "redis", url=f"redis://127.0.0.1:{redis_server.server_address[1]}"
+            )
+        else:
+            store = notification_handler.create_subscriber_store(
+                "file", path=os.path.join(tmp_dir, 'subscribers.bin')
+            )
+        
+        # 購読・解除・再購読を含めた購読者を登録
+        rng = random.Random(0)
+        expected = set()
+        for _ in range(args.subscribers):
+            user_id = "U" + "%032x" % rng.getrandbits(128)
+            levels = rng.choice([[], [1], [3], [2, 3]])
+            notification_handler.subscribe(user_id, levels, store)
+            expected.add(user_id)
+        for user_id in rng.sample(sorted(expected), args.subscribers // 10):
+            notification_handler.unsubscribe(user_id, store)
+            expected.discard(user_id)
+        
+        if args.store == "file":
+            file_size = os.path.getsize(store.path)
+            store.compact()
+            print(f"購読者ファイル: {file_size}バイト → 圧縮後 {os.path.getsize(store.path)}バイト")
+        
+        # リトライ待ちなしで計測する
+        report = notification_handler.broadcast_tempered(
+            store.load(), access_token="dummy", endpoint=endpoint,
+            concurrency=args.concurrency, retry_backoff=0
+        )
+    
+    redis_server.shutdown()
+    server.shutdown()
+    
+    print(notification_handler.format_report(report))
+    print(f"スタブへのリクエスト数: {state.requests} / 最大ボディサイズ: {state.max_body}バイト")
+    
+    duplicated = [user_id for user_id, count in state.delivered.items() if count > 1]
+    missing = expected - set(state.delivered)
+    unexpected = set(state.delivered) - expected
+    if duplicated or unexpected or (missing and not report["failed"]):
+        print(f"[NG] 重複: {len(duplicated)} / 未達: {len(missing)} / 対象外: {len(unexpected)}")
+        return 1
+    print(f"配信確認: 重複なし / 未達 {len(missing)}件（リトライ上限超過分）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
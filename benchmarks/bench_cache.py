@@ -0,0 +1,250 @@
+# benchmarks/bench_cache.py
+"""
+キャッシュバックエンド（lru / shm / redis）の速度・ヒット率・重複排除を確認する
+
+使い方:
+  python benchmarks/bench_cache.py --workers 4 --requests 5000
+
+redis はローカルのスタンドインサーバー（GET / SET PX NX / DEL / DBSIZE / HSET / HDEL / HSCAN / AUTH / SELECT のみ対応）に対して実行する。
+複数のワーカープロセスから同じ返信キャッシュと重複排除の状態を使い、
+shm / redis ではワーカー間でキャッシュが共有されること、
+同じイベントIDがちょうど1回だけ処理されることを確認する。
+最後に、停止中のRedisに対して接続待ちを繰り返さないこと、SET NX の応答がタイムアウトしても最初の配信を処理すること、
+処理に失敗したイベントを処理し直せることを確認する。
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+# リポジトリのルートをPYTHONPATHに追加
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(bench_dir))
+
+import cache_handler  # noqa: E402
+from skills_handler import search_skill, skills_data  # noqa: E402
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """
+    テスト用の最小限のRedis互換サーバー
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, reply_delay=0, slow_replies=0, ssl_context=None):
+        super().__init__(('127.0.0.1', 0), RedisStandInHandler)
+        self.data = {}
+        self.hashes = {}
+        self.lock = threading.Lock()
+        # 最初の slow_replies 回の応答を reply_delay 秒遅らせる
+        # （コマンドは実行したうえで、クライアントのタイムアウト後に応答する場合の確認用）
+        self.reply_delay = reply_delay
+        self.slow_replies = slow_replies
+        self.ssl_context = ssl_context
+        self.auth = []
+    
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        return sock, address
+
+
+class RedisStandInHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+    
+    def bulk(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    
+    def handle(self):
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            now = time.monotonic()
+            with server.lock:
+                if name == b"GET":
+                    entry = server.data.get(args[1])
+                    reply = self.bulk(entry[1] if entry and entry[0] > now else None)
+                elif name == b"SET":
+                    options = [arg.upper() for arg in args[3:]]
+                    expires = now + int(args[4]) / 1000 if b"PX" in options else float("inf")
+                    entry = server.data.get(args[1])
+                    if b"NX" in options and entry and entry[0] > now:
+                        reply = b"$-1\r\n"
+                    else:
+                        server.data[args[1]] = (expires, args[2])
+                        reply = b"+OK\r\n"
+                elif name in (b"AUTH", b"SELECT"):
+                    if name == b"AUTH":
+                        server.auth.append(args[1:])
+                    reply = b"+OK\r\n"
+                elif name == b"DEL":
+                    reply = b":%d\r\n" % (server.data.pop(args[1], None) is not None)
+                elif name == b"HSET":
+                    fields = server.hashes.setdefault(args[1], {})
+                    added = args[2] not in fields
+                    fields[args[2]] = args[3]
+                    reply = b":%d\r\n" % added
+                elif name == b"HDEL":
+                    removed = server.hashes.get(args[1], {}).pop(args[2], None) is not None
+                    reply = b":%d\r\n" % removed
+                elif name == b"HSCAN":
+                    # カーソルは並べたフィールドの位置（0で終了）
+                    fields = sorted(server.hashes.get(args[1], {}).items())
+                    start = int(args[2])
+                    count = int(args[4]) if len(args) > 4 else 10
+                    page = fields[start:start + count]
+                    cursor = b"%d" % (start + count) if start + count < len(fields) else b"0"
+                    items = [item for field in page for item in field]
+                    reply = b"*2\r\n" + self.bulk(cursor) + b"*%d\r\n" % len(items) + b"".join(self.bulk(item) for item in items)
+                elif name == b"DBSIZE":
+                    reply = b":%d\r\n" % sum(1 for expires, _ in server.data.values() if expires > now)
+                else:
+                    reply = b"-ERR unknown command\r\n"
+            with server.lock:
+                slow = server.slow_replies > 0
+                server.slow_replies -= slow
+            if slow:
+                time.sleep(server.reply_delay)
+            self.wfile.write(reply)
+
+
+def worker(backend, options, queries, event_ids, results):
+    """
+    ワーカープロセス: 返信キャッシュを使って検索し、イベントの重複排除を行う
+    """
+    # 返信キャッシュと重複排除の両方を同じバックエンドにして比較する
+    cache_handler.reply_cache = cache_handler.create_cache(backend, **options)
+    cache_handler.event_cache = cache_handler.create_cache(backend, **options)
+    cached_search = cache_handler.cached_reply("skill")(search_skill)
+    
+    start = time.perf_counter()
+    for query in queries:
+        cached_search(query)
+    elapsed = time.perf_counter() - start
+    
+    processed = [event_id for event_id in event_ids if cache_handler.mark_event_processed(event_id)]
+    stats = cache_handler.cache_stats()["reply"]
+    results.put((elapsed, len(queries), processed, stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キャッシュバックエンドのベンチマーク")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5000, help="ワーカーごとの検索回数")
+    args = parser.parse_args()
+    
+    # よく検索されるスキルほど多く出るように偏りをつけた検索語
+    names = [skill.name for skill in skills_data]
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    
+    server = RedisStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backends = {
+            "lru": {},
+            "shm": {"path": os.path.join(tmp_dir, "cache.sqlite3")},
+            "redis": {"url": f"redis://127.0.0.1:{server.server_address[1]}"},
+        }
+        print(f"{'バックエンド':<10}{'us/検索':>10}{'ヒット率':>10}{'処理イベント':>14}  判定")
+        for backend, options in backends.items():
+            # 全ワーカーに同じイベントIDを配り、再送を模擬する
+            event_ids = [f"{backend}-{i}" for i in range(200)]
+            results = multiprocessing.Queue()
+            processes = []
+            for index in range(args.workers):
+                rng = random.Random(index)
+                queries = rng.choices(names, weights, k=args.requests)
+                process = multiprocessing.Process(
+                    target=worker, args=(backend, options, queries, event_ids, results)
+                )
+                process.start()
+                processes.append(process)
+            outputs = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            
+            elapsed = sum(output[0] for output in outputs)
+            calls = sum(output[1] for output in outputs)
+            hits = sum(output[3]["hits"] for output in outputs)
+            lookups = hits + sum(output[3]["misses"] for output in outputs)
+            processed = [event_id for output in outputs for event_id in output[2]]
+            
+            # プロセス内LRUはワーカーごとに処理し、共有バックエンドはちょうど1回だけ処理する
+            expected = len(event_ids) * (args.workers if backend == "lru" else 1)
+            ok = len(processed) == expected and (backend == "lru" or len(set(processed)) == len(processed))
+            failed = failed or not ok
+            print(f"{backend:<10}{elapsed / calls * 1e6:>10.1f}{hits / lookups:>10.1%}{len(processed):>14}  {'OK' if ok else 'NG'}")
+    
+    server.shutdown()
+    
+    # Redisが停止しているときは、接続の失敗後しばらく接続を試さずに処理を続けること
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        down_url = f"redis://127.0.0.1:{sock.getsockname()[1]}"
+    cache_handler.reply_cache = cache_handler.create_cache("redis", url=down_url)
+    cache_handler.event_cache = cache_handler.create_cache("redis", url=down_url)
+    cached_search = cache_handler.cached_reply("skill")(search_skill)
+    queries = random.Random(0).choices(names, weights, k=args.requests)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for query in queries:
+            cached_search(query)
+        elapsed = time.perf_counter() - start
+        processed = cache_handler.mark_event_processed("down-0")
+    stats = cache_handler.reply_cache.stats()
+    ok = processed and stats["errors"] <= 2 and stats["bypassed"] >= len(queries) - 2
+    failed = failed or not ok
+    print(f"{'redis停止':<10}{elapsed / len(queries) * 1e6:>10.1f}{'-':>10}{int(processed):>14}  {'OK' if ok else 'NG'}"
+          f"（接続エラー {stats['errors']}回 / 接続せずに処理 {stats['bypassed']}回）")
+    
+    # SET NX を実行したあと応答がタイムアウトしても、最初の配信を重複と判定しないこと
+    slow_server = RedisStandIn(reply_delay=0.3, slow_replies=1)
+    threading.Thread(target=slow_server.serve_forever, daemon=True).start()
+    cache_handler.event_cache = cache_handler.create_cache(
+        "redis", url=f"redis://127.0.0.1:{slow_server.server_address[1]}", timeout=0.1, retry_after=0
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        processed = cache_handler.mark_event_processed("slow-0")
+    slow_server.shutdown()
+    if not processed:
+        print("[NG] 応答がタイムアウトした最初のイベントを重複と判定しました")
+        failed = True
+    
+    # 処理に失敗したイベントは記録を消して、再送時に処理し直せること
+    cache_handler.event_cache = cache_handler.create_cache("lru")
+    cache_handler.mark_event_processed("retry-0")
+    cache_handler.unmark_event_processed("retry-0")
+    if not cache_handler.mark_event_processed("retry-0"):
+        print("[NG] 記録を消したイベントを処理し直せません")
+        failed = True
+    
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
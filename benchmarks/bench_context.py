@@ -0,0 +1,72 @@
+# benchmarks/bench_context.py
+"""
+会話コンテキストのメモリ使用量と処理速度を計測する
+
+使い方:
+  python benchmarks/bench_context.py --users 300000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# リポジトリのルートをPYTHONPATHに追加
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(bench_dir))
+
+import context_handler  # noqa: E402
+from monster_handler import weakness_matrix_names  # noqa: E402
+from skills_handler import skills_data  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会話コンテキストのベンチマーク")
+    parser.add_argument("--users", type=int, default=300000)
+    args = parser.parse_args()
+    
+    # 既定の設定（CONTEXT_TTL / CONTEXT_MAX_USERS）のまま計測する
+    capacity = context_handler.CONTEXT_MAX_USERS // 2
+    
+    rng = random.Random(0)
+    user_ids = ["U%032x" % rng.getrandbits(128) for _ in range(args.users)]
+    entities = [(context_handler.KIND_MONSTER, name) for name in weakness_matrix_names]
+    entities += [(context_handler.KIND_SKILL, skill.name) for skill in skills_data]
+    
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for user_id in user_ids:
+        kind, name = rng.choice(entities)
+        context_handler.remember(user_id, kind, name)
+    remember_elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    rng.shuffle(user_ids)
+    start = time.perf_counter()
+    hits = sum(1 for user_id in user_ids if context_handler.recall(user_id))
+    recall_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for i in range(args.users):
+        context_handler.recall("U%032x" % i)
+    miss_elapsed = time.perf_counter() - start
+    
+    used = current - base
+    print(f"上限: {context_handler.CONTEXT_MAX_USERS}（確実に保持できるのは {capacity} ユーザー）")
+    print(f"ユーザー数: {args.users} / 保持数: {context_handler.context_size()} / ヒット: {hits}（ヒット率 {hits / args.users:.1%}）")
+    print(f"メモリ: {used / 1024 / 1024:.1f}MiB（1ユーザーあたり {used / args.users:.0f}バイト）")
+    print(f"remember: {remember_elapsed / args.users * 1e6:.2f}us/回")
+    print(f"recall(ヒット): {recall_elapsed / args.users * 1e6:.2f}us/回")
+    print(f"recall(ミス): {miss_elapsed / args.users * 1e6:.2f}us/回")
+    # 確実に保持できる人数までは全員ヒットすること
+    if args.users <= capacity and hits != args.users:
+        print("[NG] 上限内のユーザー数なのにヒット率が100%ではありません")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
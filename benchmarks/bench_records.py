@@ -0,0 +1,58 @@
+# benchmarks/bench_records.py
+"""
+スキルデータをJSONの辞書のまま保持した場合とレコードに変換した場合のメモリ使用量を比較する
+
+使い方:
+  python benchmarks/bench_records.py
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+# リポジトリのルートをPYTHONPATHに追加
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(bench_dir))
+
+import skills_handler  # noqa: E402
+
+
+def measure(load):
+    """
+    load() が返すオブジェクトを保持したままのメモリ増加量（バイト）を返す
+    """
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    result = load()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - base
+
+
+def load_raw():
+    with open(os.path.join(skills_handler.data_dir, 'updated_mhwilds_skills.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_records():
+    return skills_handler.build_skill_records(load_raw())
+
+
+def main():
+    raw, raw_bytes = measure(load_raw)
+    (records, armor_pieces), record_bytes = measure(load_records)
+    
+    armor_entries = sum(len(skill.armors) for skill in records)
+    saved = raw_bytes - record_bytes
+    print(f"スキル数: {len(records)} / 防具エントリ: {armor_entries} / 共有防具: {len(armor_pieces)}")
+    print(f"JSONの辞書のまま: {raw_bytes / 1024:.1f}KiB")
+    print(f"レコード: {record_bytes / 1024:.1f}KiB")
+    print(f"1ワーカーあたりの削減量: {saved / 1024:.1f}KiB（{saved / raw_bytes * 100:.0f}%）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
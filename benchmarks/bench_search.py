@@ -0,0 +1,270 @@
+# benchmarks/bench_search.py
+"""
+検索関数のマイクロベンチマークと出力の同一性チェック
+
+使い方:
+  python benchmarks/bench_search.py                  # 計測 + ゴールデン比較 + ベースライン比較
+  python benchmarks/bench_search.py --update-golden  # 現在の出力をゴールデンとして保存
+  python benchmarks/bench_search.py --update-baseline  # 現在の計測値をベースラインとして保存
+  python benchmarks/bench_search.py --target app     # app.py 側の検索関数を対象にする（Flask必須）
+
+ゴールデン出力やベースラインがない場合、ゴールデン出力と一致しない場合、
+またはベースラインから許容範囲を超えて遅くなった場合は終了コード1で終了する。
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# リポジトリのルートをPYTHONPATHに追加
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(bench_dir)
+sys.path.insert(0, root_dir)
+
+data_dir = os.path.join(root_dir, 'data')
+
+GOLDEN_PATH = os.path.join(bench_dir, 'golden_search.json')
+BASELINE_PATH = os.path.join(bench_dir, 'baseline_search.json')
+
+# 計測対象の関数名
+FUNCTION_NAMES = [
+    "search_skill",
+    "search_monster_weakness",
+    "search_by_weakness",
+    "search_tempered_monsters",
+    "search_tempered_monster",
+]
+
+# 存在しない名前（ヒットしないケース）
+MISS_QUERIES = ["ほげほげ", "存在しないスキル", "xyz", "ミラボレアス", "ラオシャンロン", "　"]
+
+
+def load_targets(target):
+    """
+    計測対象の関数を {関数名: 関数} の辞書で返す
+    """
+    if target == "app":
+        # LINEの設定がなくても app を読み込めるようにする（返信は送信しない）
+        os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "dummy")
+        os.environ.setdefault("LINE_CHANNEL_SECRET", "dummy")
+        module = importlib.import_module("app")
+        # 返信キャッシュ（cached_reply）を通すと2回目以降はキャッシュのヒットしか計測できないため、元の関数を使う
+        return {name: getattr(module, name).__wrapped__ for name in FUNCTION_NAMES}
+
+    skills_module = importlib.import_module("skills_handler")
+    monster_module = importlib.import_module("monster_handler")
+    targets = {"search_skill": skills_module.search_skill}
+    for name in FUNCTION_NAMES[1:]:
+        targets[name] = getattr(monster_module, name)
+    return targets
+
+
+def substrings(name):
+    """
+    部分一致検索用に名前の先頭・末尾・中間の部分文字列を返す
+    """
+    result = []
+    if len(name) >= 3:
+        result.append(name[:2])
+        result.append(name[-2:])
+        result.append(name[1:-1])
+    return result
+
+
+def build_corpus():
+    """
+    関数ごとの入力コーパスを作成する
+    スキル・装飾品・防具・モンスターの全名称とその部分文字列、ヒットしない名前を含む
+    """
+    with open(os.path.join(data_dir, 'updated_mhwilds_skills.json'), 'r', encoding='utf-8') as f:
+        skills_data = json.load(f)
+    with open(os.path.join(data_dir, 'mhwilds_weakness.json'), 'r', encoding='utf-8') as f:
+        weakness_data = json.load(f)
+    with open(os.path.join(data_dir, 'mhwilds_tempered_monsters.json'), 'r', encoding='utf-8') as f:
+        tempered_data = json.load(f)
+
+    skill_names = [skill["スキル名"] for skill in skills_data]
+    deco_names = [deco["装飾品名"] for skill in skills_data for deco in skill.get("装飾品", []) if deco.get("装飾品名")]
+    armor_names = [armor["防具名"] for skill in skills_data for armor in skill.get("装備", []) if armor.get("防具名")]
+    monster_names = [monster["モンスター名"] for monster in weakness_data.get("モンスター情報", [])]
+    monster_names += [monster["モンスター名"] for monster in tempered_data.get("モンスター一覧", [])]
+    elements = list(weakness_data.get("属性アイコン", {}).keys())
+
+    def unique(items):
+        # 順序を保ったまま重複を除去
+        return list(dict.fromkeys(items))
+
+    skill_queries = skill_names + deco_names + armor_names
+    skill_queries += [sub for name in skill_queries for sub in substrings(name)]
+    skill_queries = unique(skill_queries + MISS_QUERIES + [""])
+
+    monster_queries = monster_names + [sub for name in monster_names for sub in substrings(name)]
+    monster_queries = unique(monster_queries + MISS_QUERIES)
+
+    return {
+        "search_skill": skill_queries,
+        "search_monster_weakness": unique(monster_queries + [""]),
+        "search_by_weakness": unique(elements + ["無属性", "毒属性"]),
+        "search_tempered_monsters": [0, 1, 2, 3, 4],
+        "search_tempered_monster": monster_queries,
+    }
+
+
+def digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compute_outputs(targets, corpus):
+    """
+    全入力に対する出力のハッシュを {関数名: {入力: ハッシュ}} で返す
+    """
+    outputs = {}
+    for name, func in targets.items():
+        outputs[name] = {str(query): digest(func(query)) for query in corpus[name]}
+    return outputs
+
+
+def check_golden(targets, corpus, golden):
+    """
+    ゴールデン出力と比較し、不一致の件数を返す
+    ゴールデン出力にない入力（コーパスやデータが増えた場合）も不一致として数える
+    """
+    mismatches = 0
+    for name, func in targets.items():
+        expected = golden.get(name, {})
+        for query in corpus[name]:
+            key = str(query)
+            if key not in expected:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"[NG] {name}({query!r}) のゴールデン出力がありません（--update-golden で作成してください）")
+                continue
+            actual = func(query)
+            if digest(actual) != expected[key]:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"[NG] {name}({query!r}) の出力がゴールデンと一致しません:\n{actual}\n")
+    return mismatches
+
+
+def measure_latency(func, queries, repeat, min_calls=2000):
+    """
+    1呼び出しあたりの平均時間（マイクロ秒）を repeat 回計測し、最小値を返す
+    入力数が少ない関数は min_calls 回以上になるまで入力を繰り返す
+    """
+    loops = max(1, min_calls // len(queries))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            for query in queries:
+                func(query)
+        elapsed = (time.perf_counter() - start) / (len(queries) * loops) * 1e6
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def measure_allocations(func, queries):
+    """
+    1呼び出しあたりの確保メモリのピークと呼び出し後も残るメモリ（バイト）の平均を返す
+    """
+    peak_total = 0
+    retained_total = 0
+    tracemalloc.start()
+    try:
+        for query in queries:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            func(query)
+            current, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - base
+            retained_total += current - base
+    finally:
+        tracemalloc.stop()
+    return peak_total / len(queries), retained_total / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="検索関数のベンチマーク")
+    parser.add_argument("--target", choices=["handlers", "app"], default="handlers")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="ベースラインに対して許容する遅延の割合（0.5 = 50%%）")
+    parser.add_argument("--alloc-sample", type=int, default=50,
+                        help="メモリ確保量を計測する入力数（関数ごと）")
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    targets = load_targets(args.target)
+    corpus = build_corpus()
+
+    # ゴールデン出力
+    golden_all = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+            golden_all = json.load(f)
+
+    if args.update_golden:
+        golden_all[args.target] = compute_outputs(targets, corpus)
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(golden_all, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"ゴールデン出力を保存しました: {GOLDEN_PATH}")
+
+    failed = False
+    golden = golden_all.get(args.target)
+    if golden:
+        mismatches = check_golden(targets, corpus, golden)
+        if mismatches:
+            print(f"ゴールデン出力との不一致: {mismatches}件")
+            failed = True
+        else:
+            print("ゴールデン出力: すべて一致")
+    else:
+        print("[NG] ゴールデン出力がありません（--update-golden で作成してください）")
+        failed = True
+
+    # レイテンシとメモリ確保量
+    baseline_all = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            baseline_all = json.load(f)
+    baseline = baseline_all.get(args.target, {})
+
+    results = {}
+    print(f"\n{'関数':<26}{'入力数':>8}{'us/call':>12}{'基準':>12}{'peak B/call':>14}{'kept B/call':>13}")
+    for name, func in targets.items():
+        queries = corpus[name]
+        latency = measure_latency(func, queries, args.repeat)
+        peak, retained = measure_allocations(func, queries[:args.alloc_sample])
+        results[name] = round(latency, 3)
+
+        base = baseline.get(name)
+        base_text = f"{base:.3f}" if base else "-"
+        print(f"{name:<26}{len(queries):>8}{latency:>12.3f}{base_text:>12}{peak:>14.0f}{retained:>13.0f}")
+
+        if args.update_baseline:
+            continue
+        if not base:
+            print(f"[NG] {name} のベースラインがありません（--update-baseline で作成してください）")
+            failed = True
+        elif latency > base * (1 + args.tolerance):
+            print(f"[NG] {name} がベースラインより遅くなっています ({latency:.3f}us > {base:.3f}us)")
+            failed = True
+
+    if args.update_baseline:
+        baseline_all[args.target] = results
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baseline_all, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nベースラインを保存しました: {BASELINE_PATH}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# benchmarks/bench_startup.py
+"""
+wsgi:app のコールドスタート時間を計測する
+
+使い方:
+  python benchmarks/bench_startup.py --runs 5
+
+新しいPythonプロセスで以下を計測し、中央値を表示する。
+- wsgi の読み込み時間
+- warm_up() の時間
+- 最初のWebhook（/callback）の処理時間（ウォームアップなし / あり）
+
+返信はローカルのスタブ（reply APIの模倣）に送るため、外部には通信しない。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(bench_dir)
+
+# 子プロセスで実行する計測スクリプト
+CHILD_SCRIPT = r'''
+import base64, hashlib, hmac, json, os, sys, time
+start = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+import app as app_module
+if sys.argv[1] == "warm":
+    app_module.warm_up()
+warmed = time.perf_counter()
+
+body = json.dumps({"destination": "U0", "events": [{
+    "type": "message", "mode": "active", "timestamp": 0, "replyToken": "r" * 32,
+    "source": {"type": "user", "userId": "U" + "0" * 32},
+    "webhookEventId": "01H0", "deliveryContext": {"isRedelivery": False},
+    "message": {"type": "text", "id": "1", "text": "リオレウス"},
+}]})
+signature = base64.b64encode(hmac.new(os.environ["LINE_CHANNEL_SECRET"].encode(), body.encode(), hashlib.sha256).digest()).decode()
+client = wsgi.app.test_client()
+request_start = time.perf_counter()
+response = client.post("/callback", data=body, headers={"X-Line-Signature": signature, "Content-Type": "application/json"})
+done = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({"import": imported - start, "warm_up": warmed - imported, "first_webhook": done - request_start}))
+'''
+
+
+class ReplyStub(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def run_child(mode, env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, mode],
+        cwd=root_dir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コールドスタートのベンチマーク")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ReplyStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    env = dict(os.environ)
+    env.update({
+        "LINE_CHANNEL_ACCESS_TOKEN": "dummy",
+        "LINE_CHANNEL_SECRET": "dummy-secret",
+        "LINE_API_ENDPOINT": f"http://127.0.0.1:{server.server_address[1]}",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    env.pop("STARTUP_PROFILE", None)
+    
+    for mode, label in [("cold", "ウォームアップなし"), ("warm", "ウォームアップあり")]:
+        results = [run_child(mode, env) for _ in range(args.runs)]
+        medians = {key: statistics.median(result[key] for result in results) * 1000 for key in results[0]}
+        print(f"{label}: 読み込み {medians['import']:.1f}ms / warm_up {medians['warm_up']:.1f}ms"
+              f" / 最初のWebhook {medians['first_webhook']:.1f}ms")
+    
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
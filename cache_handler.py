@@ -0,0 +1,509 @@
+import functools
+import glob
+import hashlib
+import os
+import socket
+import sqlite3
+import ssl
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# キャッシュの設定
+# バックエンド: lru（プロセス内）/ shm（同じホストのワーカー間で共有）/ redis（ネットワーク越しに共有）
+# CACHE_BACKEND は重複排除（ワーカー・dynoの間で共有が必要）に使う
+# 返信テキストの検索はどれも数十〜数百マイクロ秒で、共有バックエンドの往復（shm 約56us、redis 約192us）と
+# 変わらないかそれより速いため、REPLY_CACHE_BACKEND は既定でプロセス内のLRUにする
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')
+REPLY_CACHE_BACKEND = os.environ.get('REPLY_CACHE_BACKEND', 'lru')
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+CACHE_MAX_VALUE_BYTES = int(os.environ.get('CACHE_MAX_VALUE_BYTES', 64 * 1024))
+# 再送されたWebhookイベントを重複処理しないために覚えておく時間（秒）
+DEDUPE_TTL = int(os.environ.get('DEDUPE_TTL', 600))
+# Redisに接続できなかったあと、再接続を試さずにキャッシュなしで処理する時間（秒）
+CACHE_RETRY_AFTER = float(os.environ.get('CACHE_RETRY_AFTER', 5))
+
+class CacheBackend(ABC):
+    """
+    キャッシュの共通インターフェース
+    値は文字列で、TTL（秒）を過ぎたものは返さない
+    """
+    name = "base"
+    
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, max_value_bytes=CACHE_MAX_VALUE_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_value_bytes = max_value_bytes
+        self.counters = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "rejected": 0, "errors": 0, "bypassed": 0}
+    
+    @abstractmethod
+    def get(self, key):
+        """
+        キーの値を返す（なければ None）
+        """
+    
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """
+        値を保存する（max_value_bytes を超える値は保存しない）
+        """
+    
+    @abstractmethod
+    def add(self, key, value, ttl=None):
+        """
+        キーがなければ保存して True を、既にあれば False を返す
+        """
+    
+    @abstractmethod
+    def delete(self, key):
+        """
+        キーを削除する
+        """
+    
+    @abstractmethod
+    def size(self):
+        """
+        保存されている件数を返す
+        """
+    
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+    
+    def too_large(self, value):
+        if len(value.encode('utf-8')) > self.max_value_bytes:
+            self.count("rejected")
+            return True
+        return False
+    
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        stats = dict(self.counters)
+        stats["backend"] = self.name
+        stats["size"] = self.size()
+        stats["hit_rate"] = round(self.counters["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+class LRUCache(CacheBackend):
+    """
+    プロセス内のLRUキャッシュ
+    """
+    name = "lru"
+    
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.count("misses")
+                return None
+            self.entries.move_to_end(key)
+            self.count("hits")
+            return entry[1]
+    
+    def store(self, key, value, ttl):
+        self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.count("evictions")
+        self.count("sets")
+    
+    def set(self, key, value, ttl=None):
+        if self.too_large(value):
+            return
+        with self.lock:
+            self.store(key, value, ttl)
+    
+    def add(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self.store(key, value, ttl)
+            return True
+    
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def size(self):
+        return len(self.entries)
+
+class SharedMemoryCache(CacheBackend):
+    """
+    同じホストのワーカー間で共有するキャッシュ
+    tmpfs（/dev/shm）上のSQLiteファイルに保存し、ロックはSQLiteに任せる
+    """
+    name = "shm"
+    
+    def __init__(self, path=None, **options):
+        super().__init__(**options)
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        self.path = path or os.environ.get('CACHE_SHM_PATH', os.path.join(shm_dir, 'mhwilds-bot-cache.sqlite3'))
+        self.local = threading.local()
+        self.sets_since_prune = 0
+        connection = self.connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+    
+    def connection(self):
+        # SQLiteの接続はスレッドをまたいで使えないため、スレッドごとに作る
+        connection = getattr(self.local, "connection", None)
+        if connection is None or getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+    
+    def get(self, key):
+        now = time.time()
+        try:
+            connection = self.connection()
+            row = connection.execute("SELECT value, accessed FROM cache WHERE key = ? AND expires > ?", (key, now)).fetchone()
+            # 読み込みのたびに書き込むと遅くなるため、最終アクセス時刻は1秒以上経ったときだけ更新する
+            if row is not None and now - row[1] >= 1:
+                connection.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"共有キャッシュ読み込みエラー: {e}")
+            self.count("errors")
+            row = None
+        
+        if row is None:
+            self.count("misses")
+            return None
+        self.count("hits")
+        return row[0]
+    
+    def prune(self, connection, now):
+        """
+        期限切れのエントリと、上限を超えた古いエントリを削除する
+        """
+        deleted = connection.execute("DELETE FROM cache WHERE expires <= ?", (now,)).rowcount
+        deleted += connection.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self.count("evictions", deleted)
+    
+    def write(self, sql, params):
+        now = time.time()
+        try:
+            connection = self.connection()
+            written = connection.execute(sql, params).rowcount
+            # 上限の確認は書き込みのたびではなく、一定回数ごとにまとめて行う
+            self.sets_since_prune += 1
+            if self.sets_since_prune >= max(1, self.max_entries // 10):
+                self.sets_since_prune = 0
+                self.prune(connection, now)
+        except sqlite3.Error as e:
+            print(f"共有キャッシュ書き込みエラー: {e}")
+            self.count("errors")
+            return None
+        if written:
+            self.count("sets")
+        return written
+    
+    def set(self, key, value, ttl=None):
+        if self.too_large(value):
+            return
+        now = time.time()
+        self.write(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, now + (ttl or self.ttl), now)
+        )
+    
+    def add(self, key, value, ttl=None):
+        # 期限切れのエントリは上書きし、有効なエントリがあれば何もしない
+        now = time.time()
+        written = self.write(
+            "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed WHERE cache.expires <= ?",
+            (key, value, now + (ttl or self.ttl), now, now)
+        )
+        # 共有キャッシュが使えない場合は重複の判定ができないので処理を続ける
+        return written is None or written > 0
+    
+    def delete(self, key):
+        try:
+            self.connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"共有キャッシュ削除エラー: {e}")
+            self.count("errors")
+    
+    def size(self):
+        try:
+            return self.connection().execute("SELECT COUNT(*) FROM cache WHERE expires > ?", (time.time(),)).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+class RedisCache(CacheBackend):
+    """
+    Redis（RESPプロトコル）に保存するキャッシュ
+    複数のdynoで共有できる。サイズの上限はRedis側の maxmemory で管理する
+    URLは redis://[ユーザー名:パスワード@]ホスト:ポート[/DB番号] 、TLSは rediss://
+    （Heroku Redisのように自己署名証明書の場合は ?ssl_cert_reqs=none または REDIS_SSL_CERT_REQS=none）
+    接続に失敗したら retry_after 秒はRedisを使わず、毎回の接続待ちで返信が遅くならないようにする
+    """
+    name = "redis"
+    
+    def __init__(self, url=None, timeout=1.0, retry_after=None, **options):
+        super().__init__(**options)
+        self.retry_after = CACHE_RETRY_AFTER if retry_after is None else retry_after
+        self.down_until = 0.0
+        parsed = urlparse(url or os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379'))
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.username = parsed.username or None
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.use_ssl = parsed.scheme == 'rediss'
+        query = parse_qs(parsed.query)
+        cert_reqs = query.get('ssl_cert_reqs', [os.environ.get('REDIS_SSL_CERT_REQS', 'required')])[0]
+        self.ssl_verify = cert_reqs.lower() not in ('none', 'cert_none')
+        self.timeout = timeout
+        self.local = threading.local()
+    
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.use_ssl:
+            context = ssl.create_default_context()
+            if not self.ssl_verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            try:
+                sock = context.wrap_socket(sock, server_hostname=self.host)
+            except (OSError, ssl.SSLError):
+                sock.close()
+                raise
+        self.local.sock = sock
+        self.local.reader = sock.makefile('rb')
+        try:
+            if self.password:
+                # ユーザー名があればACL（Redis 6以降）の形式で認証する
+                if self.username:
+                    self.command("AUTH", self.username, self.password, retry=False)
+                else:
+                    self.command("AUTH", self.password, retry=False)
+            if self.db:
+                self.command("SELECT", self.db, retry=False)
+        except Exception:
+            self.close()
+            raise
+    
+    def close(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.local.sock = None
+    
+    def read_reply(self):
+        line = self.local.reader.readline()
+        if not line:
+            raise ConnectionError("Redisとの接続が切れました")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            raise RuntimeError(payload.decode('utf-8'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.local.reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if prefix == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise ConnectionError(f"不明な応答です: {line[:20]!r}")
+    
+    def command(self, *args, retry=True):
+        """
+        コマンドを1つ送信して応答を返す（retry が True なら、接続が切れていたら1回だけ再接続して送り直す）
+        送信後に応答を受け取れなかった場合はRedis側で実行済みかもしれないため、
+        SET NX のように送り直すと結果が変わるコマンドは retry=False で呼ぶ
+        """
+        parts = [str(arg).encode('utf-8') for arg in args]
+        request = b"*%d\r\n" % len(parts) + b"".join(b"$%d\r\n%s\r\n" % (len(part), part) for part in parts)
+        for attempt in range(2 if retry else 1):
+            if getattr(self.local, "sock", None) is None:
+                self.connect()
+            try:
+                self.local.sock.sendall(request)
+                return self.read_reply()
+            except (OSError, ConnectionError):
+                self.close()
+                if attempt or not retry:
+                    raise
+    
+    def available(self):
+        """
+        接続の失敗から retry_after 秒経っていなければ False を返す（Redisを使わずに処理を続ける）
+        """
+        if time.monotonic() < self.down_until:
+            self.count("bypassed")
+            return False
+        return True
+    
+    def failed(self, error):
+        self.count("errors")
+        # エラー応答ではなく接続の問題なら、しばらくRedisを使わない
+        if not isinstance(error, RuntimeError):
+            self.down_until = time.monotonic() + self.retry_after
+    
+    def get(self, key):
+        value = None
+        if self.available():
+            try:
+                value = self.command("GET", key)
+            except (OSError, ConnectionError, RuntimeError) as e:
+                print(f"Redisキャッシュ読み込みエラー: {e}")
+                self.failed(e)
+        self.count("misses" if value is None else "hits")
+        return value
+    
+    def set(self, key, value, ttl=None):
+        if self.too_large(value) or not self.available():
+            return
+        try:
+            self.command("SET", key, value, "PX", int((ttl or self.ttl) * 1000))
+            self.count("sets")
+        except (OSError, ConnectionError, RuntimeError) as e:
+            print(f"Redisキャッシュ書き込みエラー: {e}")
+            self.failed(e)
+    
+    def add(self, key, value, ttl=None):
+        # Redisが使えない場合は重複の判定ができないので処理を続ける
+        if not self.available():
+            return True
+        try:
+            # 送り直すと自分が書き込んだキーを見つけて重複と判定してしまうため、送り直さない
+            reply = self.command("SET", key, value, "PX", int((ttl or self.ttl) * 1000), "NX", retry=False)
+        except (OSError, ConnectionError, RuntimeError) as e:
+            # 応答を受け取れなかった場合も、重複かどうか分からないので新しいイベントとして処理する
+            print(f"Redisキャッシュ書き込みエラー: {e}")
+            self.failed(e)
+            return True
+        if reply is None:
+            return False
+        self.count("sets")
+        return True
+    
+    def delete(self, key):
+        if not self.available():
+            return
+        try:
+            self.command("DEL", key)
+        except (OSError, ConnectionError, RuntimeError) as e:
+            print(f"Redisキャッシュ削除エラー: {e}")
+            self.failed(e)
+    
+    def size(self):
+        if time.monotonic() < self.down_until:
+            return 0
+        try:
+            return self.command("DBSIZE")
+        except (OSError, ConnectionError, RuntimeError):
+            return 0
+
+CACHE_BACKENDS = {
+    "lru": LRUCache,
+    "shm": SharedMemoryCache,
+    "redis": RedisCache,
+}
+
+def create_cache(backend=None, **options):
+    """
+    設定に応じたキャッシュを作成する
+    """
+    backend = backend or CACHE_BACKEND
+    if backend not in CACHE_BACKENDS:
+        print(f"不明なキャッシュバックエンドです: {backend}（lru を使用します）")
+        backend = "lru"
+    return CACHE_BACKENDS[backend](**options)
+
+def compute_cache_version():
+    """
+    返信キャッシュのキーに含めるバージョンを返す（CACHE_VERSION で指定しなければデータと実装のハッシュ）
+    データや実装を変えてデプロイしたときに、共有キャッシュに残った古い返信を使わないようにする
+    """
+    version = os.environ.get('CACHE_VERSION')
+    if version:
+        return version
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    paths = sorted(glob.glob(os.path.join(root_dir, 'data', '*.json')) + glob.glob(os.path.join(root_dir, '*.py')))
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError as e:
+            print(f"キャッシュバージョン計算エラー: {e}")
+    return digest.hexdigest()[:12]
+
+CACHE_VERSION = compute_cache_version()
+
+# 返信テキストのキャッシュと、重複排除（処理済みのWebhookイベント）のキャッシュ
+reply_cache = create_cache(REPLY_CACHE_BACKEND)
+event_cache = create_cache()
+
+def cached_reply(namespace, error_reply=None):
+    """
+    検索関数の返信テキストをキャッシュするデコレーター
+    検索に失敗したときの返信（error_reply）はキャッシュせず、次の呼び出しで検索し直す
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(query):
+            key = f"reply:{CACHE_VERSION}:{namespace}:{query}"
+            result = reply_cache.get(key)
+            if result is None:
+                result = func(query)
+                if result != error_reply:
+                    reply_cache.set(key, result)
+            return result
+        return wrapper
+    return decorator
+
+def mark_event_processed(event_id):
+    """
+    Webhookイベントを処理済みとして記録する
+    初めてのイベントなら True、既に（他のワーカーでも）処理済みなら False を返す
+    """
+    if not event_id:
+        return True
+    return event_cache.add(f"event:{event_id}", "1", ttl=DEDUPE_TTL)
+
+def unmark_event_processed(event_id):
+    """
+    処理に失敗したイベントの記録を消し、再送されたときに処理し直せるようにする
+    """
+    if event_id:
+        event_cache.delete(f"event:{event_id}")
+
+def cache_stats():
+    return {"reply": reply_cache.stats(), "dedupe": event_cache.stats()}
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+# 会話コンテキストの有効期間（秒）と保持するユーザー数の上限
+# 世代単位で破棄するため、エントリが実際に残るのは最後に参照されてから CONTEXT_TTL/2〜CONTEXT_TTL 秒
+# （既定では5〜10分。世代の入れ替え直前に書き込まれたエントリほど早く消える）
+# また、確実に保持できるのは上限の半分まで（既定では30万ユーザー）
+CONTEXT_TTL = int(os.environ.get('CONTEXT_TTL', 600))
+CONTEXT_MAX_USERS = int(os.environ.get('CONTEXT_MAX_USERS', 600000))
+
+# コンテキストの種類
+KIND_MONSTER = "monster"
+KIND_SKILL = "skill"
+
+# 直近に解決したエンティティ（種類, 名前）の一覧
+# ユーザーごとには一覧の番号だけを保持する（モンスター・スキル数は256未満なので小さい整数を共有できる）
+entities = []
+entity_index = {}
+
+# 世代別の辞書 {ユーザーID(16バイト): エンティティ番号}
+# 書き込みは常に current に行い、TTLの半分が経過するか上限の半分に達したら
+# current を previous に回す。各世代は作成からTTLが過ぎたら丸ごと破棄するので、
+# 最後に参照されてからTTLを超えたエントリは返さず、保持数も上限を超えない
+# （エントリごとの時刻は持たないため、TTL/2を過ぎたエントリは世代と一緒に消えることがある）
+current_generation = {}
+previous_generation = {}
+current_started = time.monotonic()
+previous_started = current_started
+generation_lock = threading.Lock()
+
+def encode_user_id(user_id):
+    """
+    LINEのユーザーID（"U" + 32桁の16進数）を16バイトに変換する
+    """
+    try:
+        return bytes.fromhex(user_id[1:])
+    except ValueError:
+        return user_id.encode('utf-8')
+
+def maybe_rotate(now):
+    """
+    必要に応じて世代を入れ替え、期限切れの世代を破棄する
+    """
+    global current_generation, previous_generation, current_started, previous_started
+    if (now - current_started < CONTEXT_TTL / 2 and len(current_generation) < CONTEXT_MAX_USERS // 2
+            and now - previous_started < CONTEXT_TTL):
+        return
+    
+    with generation_lock:
+        if now - current_started >= CONTEXT_TTL:
+            # TTL以上書き込みがなかった場合は両方の世代とも期限切れ
+            previous_generation = {}
+            current_generation = {}
+            previous_started = current_started = now
+        elif now - current_started >= CONTEXT_TTL / 2 or len(current_generation) >= CONTEXT_MAX_USERS // 2:
+            previous_generation = current_generation
+            previous_started = current_started
+            current_generation = {}
+            current_started = now
+        elif now - previous_started >= CONTEXT_TTL:
+            previous_generation = {}
+            previous_started = current_started
+
+def remember(user_id, kind, name):
+    """
+    ユーザーが直近に検索したモンスターまたはスキルを記録する
+    """
+    if not user_id or not name:
+        return
+    
+    key = (kind, name)
+    index = entity_index.get(key)
+    if index is None:
+        with generation_lock:
+            index = entity_index.setdefault(key, len(entities))
+            if index == len(entities):
+                entities.append(key)
+    
+    now = time.monotonic()
+    maybe_rotate(now)
+    current_generation[encode_user_id(user_id)] = index
+
+def recall(user_id):
+    """
+    ユーザーが直近に検索したエンティティを (種類, 名前) で返す（なければ None）
+    """
+    if not user_id:
+        return None
+    
+    now = time.monotonic()
+    maybe_rotate(now)
+    
+    raw = encode_user_id(user_id)
+    index = current_generation.get(raw)
+    if index is None:
+        index = previous_generation.get(raw)
+        if index is None:
+            return None
+        # 参照されたエントリは current に移して有効期間を延ばす
+        current_generation[raw] = index
+    return entities[index]
+
+def forget(user_id):
+    if not user_id:
+        return
+    raw = encode_user_id(user_id)
+    current_generation.pop(raw, None)
+    previous_generation.pop(raw, None)
+
+def context_size():
+    return len(current_generation) + len(previous_generation)
@@ -0,0 +1,244 @@
+import json
+import os
+import urllib.error
+import urllib.request
+
+from monster_handler import weakness_data, weakness_monsters, tempered_data, tempered_monsters
+from skills_handler import skills_data
+
+# Flexメッセージを使うかどうか（FLEX_MESSAGES=0 でテキストのみ）
+flex_enabled = os.environ.get('FLEX_MESSAGES', '1') != '0'
+
+# LINE Messaging APIの設定
+line_api_endpoint = os.environ.get('LINE_API_ENDPOINT', 'https://api.line.me')
+REPLY_PATH = '/v2/bot/message/reply'
+
+# LINEの制限: バブル1つのJSONは30KBまで、代替テキストは1500文字まで
+FLEX_BUBBLE_MAX_BYTES = 30 * 1024
+ALT_TEXT_MAX_LENGTH = 1500
+
+# send_flex_message の結果
+# FLEX_NOT_SENT は確実に届いていない（カードなし・4xxで拒否）ので、同じreply tokenでテキストを返信してよい
+# FLEX_UNKNOWN はタイムアウトや5xxで届いたか分からない（reply tokenが使用済みかもしれない）
+FLEX_SENT = "sent"
+FLEX_NOT_SENT = "not_sent"
+FLEX_UNKNOWN = "unknown"
+
+# 弱点レベル記号の読み替えと表示色
+WEAKNESS_SYMBOLS = {
+    "◎": ("特効", "#D32F2F"),
+    "○": ("弱点", "#F57C00"),
+    "△": ("やや有効", "#757575"),
+    "×": ("耐性", "#1976D2"),
+    "-": ("不明", "#9E9E9E"),
+}
+
+def text_component(text, **options):
+    component = {"type": "text", "text": str(text) or " ", "wrap": True}
+    component.update(options)
+    return component
+
+def header_box(title, subtitle=None):
+    contents = [text_component(title, weight="bold", size="lg")]
+    if subtitle:
+        contents.append(text_component(subtitle, size="sm", color="#888888"))
+    return {"type": "box", "layout": "vertical", "contents": contents}
+
+def section(title, rows):
+    """
+    見出しと行からなる本文のまとまりを作る
+    """
+    return [
+        {"type": "separator", "margin": "md"},
+        text_component(title, weight="bold", size="sm", margin="md"),
+    ] + rows
+
+def list_rows(items):
+    return [text_component(f"・{item}", size="sm") for item in items]
+
+def serialize_card(bubble, alt_text):
+    """
+    バブルをFlexメッセージのJSON（バイト列）に変換する
+    LINEの制限を超える場合は None を返し、テキストで返信させる
+    """
+    contents = json.dumps(bubble, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if len(contents) > FLEX_BUBBLE_MAX_BYTES:
+        print(f"Flexメッセージが大きすぎるため送信しません: {alt_text} ({len(contents)}バイト)")
+        return None
+    
+    alt_text = alt_text[:ALT_TEXT_MAX_LENGTH]
+    return (
+        b'{"type":"flex","altText":' + json.dumps(alt_text, ensure_ascii=False).encode('utf-8')
+        + b',"contents":' + contents + b'}'
+    )
+
+def build_weakness_card(monster):
+    """
+    モンスターの弱点カードを作る
+    """
+    weakness_levels = weakness_data["弱点レベル"]
+    monster_name = monster["モンスター名"]
+    
+    sorted_weaknesses = sorted(
+        monster.get("弱点", {}).items(),
+        key=lambda x: weakness_levels.get(x[1], 0),
+        reverse=True
+    )
+    rows = []
+    for attr, level in sorted_weaknesses:
+        level_text, color = WEAKNESS_SYMBOLS.get(level, (level, "#757575"))
+        rows.append({
+            "type": "box",
+            "layout": "horizontal",
+            "contents": [
+                text_component(attr, size="sm", flex=3),
+                text_component(f"{level} {level_text}", size="sm", flex=2, align="end", color=color, weight="bold"),
+            ],
+        })
+    
+    effective_attrs = [attr for attr, level in sorted_weaknesses if level in ["◎", "○"]]
+    if effective_attrs:
+        hint = f"{', '.join(effective_attrs)} が効果的ニャ！"
+    else:
+        hint = "特に弱点となる属性が見当たらないニャァ。。ま、なんとかなるニャ！"
+    
+    subtitle = None
+    tempered_monster = tempered_monsters.get(monster_name)
+    if tempered_monster:
+        tempered_level = tempered_monster["歴戦危険度"]
+        subtitle = f"歴戦の個体危険度: {tempered_level}{'★' * tempered_level}"
+    
+    bubble = {
+        "type": "bubble",
+        "header": header_box(f"{monster_name}の弱点", subtitle),
+        "body": {
+            "type": "box",
+            "layout": "vertical",
+            "spacing": "sm",
+            "contents": rows + section("攻略ヒント", [text_component(hint, size="sm")]),
+        },
+    }
+    return serialize_card(bubble, f"【{monster_name}の弱点情報】")
+
+def build_tempered_level_card(level, monster_names):
+    """
+    特定の歴戦レベルのモンスター一覧カードを作る
+    """
+    danger_desc = tempered_data["歴戦危険度説明"].get(str(level), f"危険度{level}")
+    bubble = {
+        "type": "bubble",
+        "header": header_box(f"歴戦の個体 {danger_desc}"),
+        "body": {"type": "box", "layout": "vertical", "contents": list_rows(sorted(monster_names))},
+    }
+    return serialize_card(bubble, f"【歴戦の個体 {danger_desc}】")
+
+def build_tempered_card(monster):
+    """
+    モンスターの歴戦データカードを作る
+    """
+    monster_name = monster["モンスター名"]
+    tempered_level = monster["歴戦危険度"]
+    danger_desc = tempered_data["歴戦危険度説明"].get(str(tempered_level), f"危険度{tempered_level}")
+    same_level_monsters = [other["モンスター名"] for other in tempered_data["モンスター一覧"]
+                           if other["歴戦危険度"] == tempered_level and other["モンスター名"] != monster_name]
+    
+    contents = [text_component(f"歴戦の個体危険度: {tempered_level} {danger_desc}", size="sm", weight="bold")]
+    if same_level_monsters:
+        contents += section(f"同じ危険度{tempered_level}のモンスター", list_rows(sorted(same_level_monsters)))
+    
+    bubble = {
+        "type": "bubble",
+        "header": header_box(f"{monster_name}の歴戦データ"),
+        "body": {"type": "box", "layout": "vertical", "contents": contents},
+    }
+    return serialize_card(bubble, f"【{monster_name}の歴戦データ】")
+
+def build_skill_card(skill):
+    """
+    スキルの概要カードを作る
+    """
+    contents = [
+        text_component(skill.effect, size="sm"),
+        text_component(f"最大レベル: {skill.max_level}", size="sm", margin="md", weight="bold"),
+    ]
+    if skill.level_effects:
+        contents += section("レベル別効果", [
+            text_component(f"Lv{effect.level}: {effect.effect}", size="xs") for effect in skill.level_effects
+        ])
+    if skill.decorations:
+        contents += section("装飾品", list_rows(f"{deco.name} (Lv{deco.level})" for deco in skill.decorations))
+    if skill.armors:
+        armor_rows = []
+        for armor in skill.armors:
+            if armor.piece.slots:
+                slot_str = '/'.join(map(str, armor.piece.slots))
+                armor_rows.append(f"{armor.piece.name} (Lv{armor.skill_level}/{slot_str})")
+            else:
+                armor_rows.append(f"{armor.piece.name} (Lv{armor.skill_level})")
+        contents += section("発動する装備(レベル/スロット数)", [
+            text_component(f"・{row}", size="xs") for row in armor_rows
+        ])
+    
+    bubble = {
+        "type": "bubble",
+        "header": header_box(skill.name),
+        "body": {"type": "box", "layout": "vertical", "contents": contents},
+    }
+    return serialize_card(bubble, f"【スキル: {skill.name}】")
+
+def build_cards():
+    """
+    閉じたデータ（弱点・歴戦・スキル）のカードを読み込み時に1回だけ作る
+    """
+    weakness = {name: build_weakness_card(monster) for name, monster in weakness_monsters.items()}
+    tempered = {name: build_tempered_card(monster) for name, monster in tempered_monsters.items()}
+    
+    levels = {}
+    for monster in tempered_data.get("モンスター一覧", []):
+        levels.setdefault(monster["歴戦危険度"], []).append(monster["モンスター名"])
+    tempered_levels = {level: build_tempered_level_card(level, names) for level, names in levels.items()}
+    
+    skills = {}
+    for skill in skills_data:
+        skills.setdefault(skill.name, build_skill_card(skill))
+    
+    return weakness, tempered, tempered_levels, skills
+
+# 送信用に組み立て済みのカード（サイズ超過のものは None）
+try:
+    weakness_cards, tempered_cards, tempered_level_cards, skill_cards = build_cards()
+except Exception as e:
+    print(f"Flexメッセージ作成エラー: {e}")
+    weakness_cards, tempered_cards, tempered_level_cards, skill_cards = {}, {}, {}, {}
+
+def send_flex_message(reply_token, card, access_token=None, endpoint=None):
+    """
+    組み立て済みのカードをそのままreply APIに送信し、FLEX_SENT / FLEX_NOT_SENT / FLEX_UNKNOWN を返す
+    """
+    if not card:
+        return FLEX_NOT_SENT
+    
+    access_token = access_token or os.environ.get('LINE_CHANNEL_ACCESS_TOKEN')
+    endpoint = endpoint or line_api_endpoint
+    body = b'{"replyToken":' + json.dumps(reply_token).encode('ascii') + b',"messages":[' + card + b']}'
+    req = urllib.request.Request(
+        endpoint + REPLY_PATH,
+        data=body,
+        method='POST',
+        headers={
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {access_token}',
+        },
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=10) as res:
+            res.read()
+        return FLEX_SENT
+    except urllib.error.HTTPError as e:
+        print(f"Flexメッセージ送信エラー: {e.code} {e.read()[:200]!r}")
+        # 4xxはLINEが受け付けなかったことが確実
+        if 400 <= e.code < 500:
+            return FLEX_NOT_SENT
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Flexメッセージ接続エラー: {e}")
+    return FLEX_UNKNOWN
@@ -0,0 +1,13 @@
+# gunicorn.conf.py
+# gunicornは起動ディレクトリの gunicorn.conf.py を自動で読み込む
+
+def post_worker_init(worker):
+    """
+    ワーカーがリクエストを受け付ける前にLINE SDKの初期化などを済ませておく
+    """
+    import startup_profile
+    from app import warm_up
+    
+    warm_up()
+    startup_profile.uninstall()
+    startup_profile.report(f"ワーカー{worker.pid}のウォームアップ")
@@ -22,6 +22,21 @@ except Exception as e:
 weakness_monsters = {monster["モンスター名"]: monster for monster in weakness_data.get("モンスター情報", [])}
 tempered_monsters = {monster["モンスター名"]: monster for monster in tempered_data.get("モンスター一覧", [])}
 
+# 弱点スコア行列（モンスター × 属性）を読み込み時に作成
+# 各行は weakness_matrix_names の順、各列は weakness_matrix_elements の順で、値は「弱点レベル」の数値
+weakness_matrix_elements = list(weakness_data.get("属性アイコン", {}).keys())
+weakness_matrix_names = [monster["モンスター名"] for monster in weakness_data.get("モンスター情報", [])]
+weakness_matrix = [
+    tuple(weakness_data.get("弱点レベル", {}).get(monster.get("弱点", {}).get(element), 0)
+          for element in weakness_matrix_elements)
+    for monster in weakness_data.get("モンスター情報", [])
+]
+# モンスター名から行番号を引くための辞書（「・」の有無の表記ゆれも吸収）
+weakness_matrix_rows = {}
+for row, name in enumerate(weakness_matrix_names):
+    weakness_matrix_rows[name] = row
+    weakness_matrix_rows.setdefault(name.replace("・", ""), row)
+
 def search_monster_weakness(monster_name):
     """
     モンスターの弱点を検索する
@@ -181,3 +196,109 @@ def search_tempered_monster(monster_name):
         return reply_text
     else:
         return f"「{monster_name}」の歴戦情報が見つからないニャ～。待ってみるニャ。"
+
+def find_weakness_row(monster_name):
+    """
+    弱点スコア行列の行番号をモンスター名から取得する
+    複数モンスターの集計で別のモンスターを黙って選ばないよう、部分一致はしない
+    （「・」の有無の違いのみ吸収する。エイリアスは呼び出し側で正式名に変換する）
+    """
+    row = weakness_matrix_rows.get(monster_name)
+    if row is None:
+        row = weakness_matrix_rows.get(monster_name.replace("・", ""))
+    return row
+
+def score_elements(rows):
+    """
+    指定した行の弱点スコアを属性ごとに合計し、スコアの高い順に (属性, 合計) のリストで返す
+    合計が同じ属性は、耐性(×)を持つモンスターが少ない順に並べる
+    """
+    selected = [weakness_matrix[row] for row in rows]
+    resist_score = weakness_data["弱点レベル"].get("×")
+    ranking = []
+    for element, column in zip(weakness_matrix_elements, zip(*selected)):
+        ranking.append((element, sum(column), column.count(resist_score)))
+    ranking.sort(key=lambda x: (-x[1], x[2]))
+    return [(element, total) for element, total, _ in ranking]
+
+def best_element(monster_name):
+    """
+    モンスターに最も有効な属性を返す（弱点情報がなければ None）
+    """
+    row = find_weakness_row(monster_name)
+    if row is None:
+        return None
+    element, total = score_elements([row])[0]
+    return element if total > 0 else None
+
+def format_element_ranking(title, rows, not_found=None):
+    """
+    属性おすすめの返信テキストを作成する
+    """
+    ranking = score_elements(rows)
+    
+    reply_text = f"【{title}の属性おすすめ】\n\n"
+    reply_text += "▼おすすめ順（◎=4 ○=3 △=2 ×=1 の合計）\n"
+    for rank, (element, total) in enumerate(ranking, 1):
+        # モンスター別の内訳
+        breakdown = " / ".join(
+            f"{weakness_matrix_names[row]}{weakness_monsters[weakness_matrix_names[row]]['弱点'].get(element, '-')}"
+            for row in rows
+        )
+        # app.py の返信に合わせて絵文字は使用しない
+        reply_text += f"{rank}. {element}: {total}点\n"
+        if len(rows) <= 5:
+            reply_text += f"  {breakdown}\n"
+    
+    recommended = ranking[0][0]
+    # 一番おすすめの属性に耐性(×)を持つモンスター
+    resist_score = weakness_data["弱点レベル"].get("×")
+    best_column = weakness_matrix_elements.index(recommended)
+    resisted = [weakness_matrix_names[row] for row in rows if weakness_matrix[row][best_column] == resist_score]
+    reply_text += f"\n【攻略ヒント】\n{recommended}を担いでいくのがおすすめニャ！"
+    if resisted:
+        reply_text += f"\nただし {', '.join(resisted)} には効きにくいから気をつけるニャ。"
+    
+    if not_found:
+        reply_text += f"\n\n※「{'」「'.join(not_found)}」は見つからなかったニャ。"
+    
+    return reply_text
+
+def recommend_elements(monster_names):
+    """
+    複数のモンスターに対して有効な属性をおすすめ順に並べる
+    """
+    if not monster_names:
+        return "モンスター名をスペース区切りで入力してください。\n例: 属性おすすめ リオレウス ゴア・マガラ"
+    
+    rows = []
+    not_found = []
+    for monster_name in monster_names:
+        row = find_weakness_row(monster_name)
+        if row is None:
+            not_found.append(monster_name)
+        elif row not in rows:
+            rows.append(row)
+    
+    if not rows:
+        return f"ごめんニャ、「{'」「'.join(not_found)}」の弱点情報が見つけられないニャ。\nモンスター名は省略せずに入れてみるニャ！"
+    
+    title = "、".join(weakness_matrix_names[row] for row in rows)
+    return format_element_ranking(title, rows, not_found)
+
+def recommend_elements_for_tempered_level(level):
+    """
+    特定の歴戦レベルのモンスター全体に対して有効な属性をおすすめ順に並べる
+    """
+    rows = []
+    for monster in tempered_data.get("モンスター一覧", []):
+        if monster["歴戦危険度"] == level:
+            row = find_weakness_row(monster["モンスター名"])
+            if row is not None and row not in rows:
+                rows.append(row)
+    
+    if not rows:
+        return f"歴戦の個体 危険度{level}のモンスターはいないのニャ。"
+    
+    danger_desc = tempered_data["歴戦危険度説明"].get(str(level), f"危険度{level}")
+    return format_element_ranking(f"歴戦の個体 {danger_desc}", rows)
@@ -0,0 +1,363 @@
+import fcntl
+import json
+import os
+import sys
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_handler import RedisCache
+from monster_handler import search_tempered_monsters
+
+# データディレクトリを取得
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# 購読者の保存先
+# SUBSCRIBER_STORE: redis（全dynoで共有）/ file（ローカル開発・単一プロセス用）
+# Herokuではdynoのファイルシステムが再起動で消え、Heroku Schedulerのワンオフdynoからも見えないため、
+# Redisアドオン（REDIS_URL）が必須。REDIS_URL が設定されていれば既定で redis を使う
+SUBSCRIBER_STORE = os.environ.get('SUBSCRIBER_STORE', 'redis' if os.environ.get('REDIS_URL') else 'file')
+SUBSCRIBERS_REDIS_KEY = os.environ.get('SUBSCRIBERS_REDIS_KEY', 'subscribers:tempered')
+
+# file の場合の購読者ファイルのパス
+# 1レコード17バイト（ユーザーID 16バイト + 危険度のビットマスク 1バイト）の追記専用ログ
+# 複数ワーカーから同時に追記しても壊れないように、1回の書き込みは1レコードのみ
+subscribers_path = os.environ.get('SUBSCRIBERS_PATH', os.path.join(data_dir, 'subscribers.bin'))
+RECORD_SIZE = 17
+
+# 通知対象の歴戦危険度
+TEMPERED_LEVELS = [1, 2, 3]
+ALL_LEVELS_MASK = 0b111
+
+# LINE Messaging APIの設定
+line_api_endpoint = os.environ.get('LINE_API_ENDPOINT', 'https://api.line.me')
+MULTICAST_PATH = '/v2/bot/message/multicast'
+MULTICAST_MAX_RECIPIENTS = 500  # multicastの1リクエストあたりの最大送信先数
+MAX_CONCURRENCY = int(os.environ.get('BROADCAST_CONCURRENCY', 4))
+MAX_RETRIES = 3
+# リトライ前の待ち時間（秒）。attempt回目は RETRY_BACKOFF * 2**attempt 秒待つ
+RETRY_BACKOFF = float(os.environ.get('BROADCAST_RETRY_BACKOFF', 0.5))
+# Retry-After ヘッダーで指定された待ち時間の上限（秒）
+RETRY_AFTER_MAX = float(os.environ.get('BROADCAST_RETRY_AFTER_MAX', 60))
+
+def encode_user_id(user_id):
+    """
+    LINEのユーザーID（"U" + 32桁の16進数）を16バイトに変換する
+    """
+    return bytes.fromhex(user_id[1:])
+
+def decode_user_id(raw):
+    return "U" + raw.hex()
+
+def levels_to_mask(levels):
+    mask = 0
+    for level in levels:
+        mask |= 1 << (level - 1)
+    return mask
+
+def mask_to_levels(mask):
+    return [level for level in TEMPERED_LEVELS if mask & (1 << (level - 1))]
+
+class FileSubscriberStore:
+    """
+    ローカルファイルに購読者を保存する（追記専用ログ）
+    同じファイルを使うプロセスの間でしか共有できないため、Herokuでは使わない
+    """
+    name = "file"
+    
+    def __init__(self, path=None):
+        self.path = path or subscribers_path
+        self.lock_path = f"{self.path}.lock"
+    
+    def locked(self, operation):
+        """
+        ロックファイルをflockする
+        書き直し中の追記が古いファイルに書かれて消えないよう、追記は共有ロック、書き直しは排他ロックを取る
+        """
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+    
+    def unlock(self, fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+    
+    def load(self):
+        """
+        購読者ファイルを読み込み {ユーザーID(16バイト): ビットマスク} を返す
+        同じユーザーのレコードは後のものが優先され、ビットマスク0は購読解除を表す
+        """
+        subscribers = {}
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return subscribers
+        
+        # 途中で切れたレコードは無視する
+        for offset in range(0, len(data) - len(data) % RECORD_SIZE, RECORD_SIZE):
+            raw = data[offset:offset + 16]
+            mask = data[offset + 16]
+            if mask:
+                subscribers[raw] = mask
+            else:
+                subscribers.pop(raw, None)
+        return subscribers
+    
+    def save(self, user_id, mask):
+        record = encode_user_id(user_id) + bytes([mask])
+        lock = self.locked(fcntl.LOCK_SH)
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record)
+            finally:
+                os.close(fd)
+        finally:
+            self.unlock(lock)
+    
+    def compact(self):
+        """
+        購読者ファイルを現在の購読者のみのレコードに書き直す
+        書き直しの間は追記を待たせる
+        """
+        lock = self.locked(fcntl.LOCK_EX)
+        try:
+            subscribers = self.load()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(b"".join(raw + bytes([mask]) for raw, mask in subscribers.items()))
+            os.replace(tmp_path, self.path)
+        finally:
+            self.unlock(lock)
+        return subscribers
+
+class RedisSubscriberStore:
+    """
+    Redisのハッシュ（フィールド: ユーザーID、値: ビットマスク）に購読者を保存する
+    Webのdynoと Heroku Scheduler のワンオフdynoの両方から参照できる
+    """
+    name = "redis"
+    
+    # HSCANで1回に取得する件数の目安
+    SCAN_COUNT = 1000
+    
+    def __init__(self, url=None, key=None):
+        self.client = RedisCache(url=url, timeout=5.0)
+        self.key = key or SUBSCRIBERS_REDIS_KEY
+    
+    def load(self):
+        subscribers = {}
+        cursor = "0"
+        while True:
+            cursor, items = self.client.command("HSCAN", self.key, cursor, "COUNT", self.SCAN_COUNT)
+            for index in range(0, len(items), 2):
+                mask = int(items[index + 1])
+                if mask:
+                    subscribers[encode_user_id(items[index])] = mask
+            if cursor == "0":
+                return subscribers
+    
+    def save(self, user_id, mask):
+        if mask:
+            self.client.command("HSET", self.key, user_id, mask)
+        else:
+            self.client.command("HDEL", self.key, user_id)
+    
+    def compact(self):
+        # 解除したユーザーは削除済みなので書き直しは不要
+        return self.load()
+
+SUBSCRIBER_STORES = {
+    "file": FileSubscriberStore,
+    "redis": RedisSubscriberStore,
+}
+
+def create_subscriber_store(backend=None, **options):
+    """
+    設定に応じた購読者の保存先を作成する
+    """
+    backend = backend or SUBSCRIBER_STORE
+    if backend not in SUBSCRIBER_STORES:
+        print(f"不明な購読者の保存先です: {backend}（file を使用します）")
+        backend = "file"
+    return SUBSCRIBER_STORES[backend](**options)
+
+subscriber_store = create_subscriber_store()
+
+def subscribe(user_id, levels=None, store=None):
+    """
+    歴戦モンスター通知を購読する（levels 省略時は全危険度）
+    """
+    if not user_id:
+        return "ごめんニャ、通知の登録はトークルームからはできないニャ。"
+    
+    mask = levels_to_mask(levels) if levels else ALL_LEVELS_MASK
+    try:
+        (store or subscriber_store).save(user_id, mask)
+    except Exception as e:
+        print(f"通知登録エラー: {e}")
+        return "ごめんニャ、通知の登録中にエラーが発生したニャ。"
+    
+    level_text = "・".join(f"危険度{level}" for level in mask_to_levels(mask))
+    return f"歴戦の個体の通知をオンにしたニャ！（{level_text}）\n「通知オフ」でいつでも止められるニャ。"
+
+def unsubscribe(user_id, store=None):
+    """
+    歴戦モンスター通知の購読を解除する
+    """
+    if not user_id:
+        return "ごめんニャ、通知の解除はトークルームからはできないニャ。"
+    
+    try:
+        (store or subscriber_store).save(user_id, 0)
+    except Exception as e:
+        print(f"通知解除エラー: {e}")
+        return "ごめんニャ、通知の解除中にエラーが発生したニャ。"
+    
+    return "歴戦の個体の通知をオフにしたニャ。"
+
+def render_messages(mask):
+    """
+    ビットマスクに対応する送信メッセージ（JSON配列）を1回だけ組み立ててバイト列で返す
+    """
+    messages = [
+        {"type": "text", "text": search_tempered_monsters(level)}
+        for level in mask_to_levels(mask)
+    ]
+    return json.dumps(messages, ensure_ascii=False).encode('utf-8')
+
+def parse_retry_after(value):
+    """
+    Retry-After ヘッダー（秒数またはHTTP日付）を待ち時間（秒）に変換する（解釈できなければ None）
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+def post_multicast(recipients, messages_json, access_token, endpoint, retry_backoff=None):
+    """
+    multicast APIに1バッチ分を送信する
+    リトライ時も同じ X-Line-Retry-Key を使い、二重送信を防ぐ
+    429や5xxで Retry-After ヘッダーがあればその秒数、なければ指数バックオフで待つ
+    """
+    body = b'{"to":' + json.dumps(recipients).encode('ascii') + b',"messages":' + messages_json + b'}'
+    retry_key = str(uuid.uuid4())
+    retry_backoff = RETRY_BACKOFF if retry_backoff is None else retry_backoff
+    
+    for attempt in range(MAX_RETRIES + 1):
+        delay = retry_backoff * (2 ** attempt)
+        req = urllib.request.Request(
+            endpoint + MULTICAST_PATH,
+            data=body,
+            method='POST',
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {access_token}',
+                'X-Line-Retry-Key': retry_key,
+            },
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=10) as res:
+                res.read()
+            return True, attempt
+        except urllib.error.HTTPError as e:
+            # 409はリトライキーで受付済みの意味なので成功扱い
+            if e.code == 409:
+                return True, attempt
+            # 429と5xx以外はリトライしても結果が変わらない
+            if e.code != 429 and e.code < 500:
+                print(f"multicast送信エラー: {e.code} {e.read()[:200]!r}")
+                return False, attempt
+            # 待ち時間が指定されていればそれに従う
+            retry_after = parse_retry_after(e.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = retry_after
+        except (urllib.error.URLError, OSError) as e:
+            print(f"multicast接続エラー: {e}")
+        
+        if attempt < MAX_RETRIES:
+            time.sleep(delay)
+    
+    return False, MAX_RETRIES
+
+def broadcast_tempered(subscribers=None, access_token=None, endpoint=None, concurrency=None, retry_backoff=None):
+    """
+    購読者に歴戦モンスター情報を送信し、スループットのレポートを返す
+    同じ危険度の組み合わせの購読者にはメッセージを1回だけ組み立て、最大500件ずつmulticastで送る
+    """
+    # 送信中の購読・解除を消さないよう、ここでは読み込むだけで書き直さない
+    if subscribers is None:
+        subscribers = subscriber_store.load()
+    access_token = access_token or os.environ.get('LINE_CHANNEL_ACCESS_TOKEN')
+    endpoint = endpoint or line_api_endpoint
+    concurrency = concurrency or MAX_CONCURRENCY
+    
+    start = time.perf_counter()
+    
+    # 危険度の組み合わせごとに購読者をまとめる
+    groups = {}
+    for raw, mask in subscribers.items():
+        groups.setdefault(mask, []).append(decode_user_id(raw))
+    
+    batches = []
+    for mask, user_ids in groups.items():
+        messages_json = render_messages(mask)
+        for offset in range(0, len(user_ids), MULTICAST_MAX_RECIPIENTS):
+            batches.append((user_ids[offset:offset + MULTICAST_MAX_RECIPIENTS], messages_json))
+    
+    report = {
+        "subscribers": len(subscribers),
+        "message_variants": len(groups),
+        "batches": len(batches),
+        "sent": 0,
+        "failed": 0,
+        "retries": 0,
+    }
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            (recipients, executor.submit(post_multicast, recipients, messages_json, access_token, endpoint, retry_backoff))
+            for recipients, messages_json in batches
+        ]
+        for recipients, future in futures:
+            ok, retries = future.result()
+            report["retries"] += retries
+            if ok:
+                report["sent"] += len(recipients)
+            else:
+                report["failed"] += len(recipients)
+    
+    elapsed = time.perf_counter() - start
+    report["elapsed_sec"] = round(elapsed, 3)
+    report["recipients_per_sec"] = round(report["sent"] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
+
+def format_report(report):
+    return (
+        f"購読者数: {report['subscribers']} / メッセージ種類: {report['message_variants']} / バッチ数: {report['batches']}\n"
+        f"送信成功: {report['sent']} / 送信失敗: {report['failed']} / リトライ: {report['retries']}\n"
+        f"所要時間: {report['elapsed_sec']}秒 / スループット: {report['recipients_per_sec']}件/秒"
+    )
+
+# 定期実行用（例: Heroku Schedulerから python notification_handler.py）
+if __name__ == "__main__":
+    result = broadcast_tempered()
+    print(format_report(result))
+    sys.exit(1 if result["failed"] else 0)
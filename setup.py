@@ -21,5 +21,20 @@ def setup_data_directory():
     print("- mhwilds_weakness.json")
     print("- mhwilds_tempered_monsters.json")
 
+def build_alias_data():
+    """ローマ字・英語名のエイリアス索引を data/ のJSONから生成"""
+    import json
+    from alias_index import build_alias_index, data_dir
+    
+    with open(os.path.join(data_dir, 'mhwilds_weakness.json'), 'r', encoding='utf-8') as f:
+        monster_names = [monster["モンスター名"] for monster in json.load(f).get("モンスター情報", [])]
+    with open(os.path.join(data_dir, 'updated_mhwilds_skills.json'), 'r', encoding='utf-8') as f:
+        skill_names = [skill["スキル名"] for skill in json.load(f)]
+    
+    index = build_alias_index(monster_names, skill_names)
+    print(f"\nエイリアス索引を作成しました: モンスター {len(index['モンスター'])}件 / スキル {len(index['スキル'])}件")
+    print("- mhwilds_aliases.json")
+
 if __name__ == "__main__":
     setup_data_directory()
+    build_alias_data()
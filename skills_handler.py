@@ -1,119 +1,185 @@
 import json
 import os
+import sys
+from collections import namedtuple
 
 # データディレクトリを取得
 data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 
+# スキル・装飾品・防具のレコード
+# JSONの辞書のままだと防具ごとに「防具名」「スキルレベル」などのキーを持つため、
+# 読み込み時に不変のレコード（__slots__ を持つタプル）へ変換する
+Skill = namedtuple("Skill", ["name", "effect", "max_level", "skill_id", "url", "level_effects", "decorations", "armors"])
+LevelEffect = namedtuple("LevelEffect", ["level", "effect"])
+Decoration = namedtuple("Decoration", ["name", "level", "skill_text", "url"])
+# 防具そのもの（同じ防具は複数のスキルで共有する）
+ArmorPiece = namedtuple("ArmorPiece", ["name", "slots", "url"])
+# スキルごとの防具（防具とその防具で発動するスキルレベル）
+SkillArmor = namedtuple("SkillArmor", ["piece", "skill_level"])
+
+def build_skill_records(raw_skills):
+    """
+    JSONから読み込んだスキルデータをレコードに変換する
+    名前は intern し、同じ防具は1つの ArmorPiece を共有する
+    レベル別効果はレベル順、防具はスキルレベルの高い順に並べておく
+    """
+    armor_pieces = {}
+    records = []
+    for skill in raw_skills:
+        level_effects = tuple(
+            LevelEffect(effect["レベル"], effect["効果"])
+            for effect in sorted(skill.get("レベル別効果", []), key=lambda x: x["レベル"])
+        )
+        decorations = tuple(
+            Decoration(sys.intern(deco.get("装飾品名", "")), deco.get("装飾品Lv", ""), deco.get("スキル", ""), deco.get("装飾品URL", ""))
+            for deco in skill.get("装飾品", [])
+        )
+        
+        # 防具は読み込み順に共有レコードを作ってから並べ替える
+        armors = []
+        for armor in skill.get("装備", []):
+            armor_name = sys.intern(armor.get("防具名", ""))
+            piece = armor_pieces.get(armor_name)
+            if piece is None:
+                piece = ArmorPiece(armor_name, tuple(armor.get("スロット", [])), sys.intern(armor.get("防具URL", "")))
+                armor_pieces[armor_name] = piece
+            armors.append(SkillArmor(piece, armor.get("スキルレベル", "")))
+        armors.sort(key=lambda x: x.skill_level or 0, reverse=True)
+        
+        records.append(Skill(
+            sys.intern(skill["スキル名"]),
+            skill["効果"],
+            skill["最大レベル"],
+            skill.get("スキルID", ""),
+            skill.get("詳細URL", ""),
+            level_effects,
+            decorations,
+            tuple(armors),
+        ))
+    return records, armor_pieces
+
 # JSONデータの読み込み
 try:
     # スキルデータ
     with open(os.path.join(data_dir, 'updated_mhwilds_skills.json'), 'r', encoding='utf-8') as f:
-        skills_data = json.load(f)
+        skills_data, armor_pieces = build_skill_records(json.load(f))
 except Exception as e:
     print(f"スキルデータ読み込みエラー: {e}")
-    skills_data = []
+    skills_data, armor_pieces = [], {}
 
+# スキル名からスキルを検索するための辞書（同名は最初のものを優先）
+skills_by_name = {}
 # 装飾品辞書の作成（装飾品名からスキル情報を検索できるように）
 deco_to_skill = {}
 # 装備辞書の作成（防具名からスキル情報を検索できるように）
-armor_to_skill = {}
+# 部分一致で最初に見つかる防具を変えないよう、キーの順番は読み込み順（armor_pieces の順）に合わせる
+armor_to_skill = dict.fromkeys(name for name in armor_pieces if name)
 
 for skill in skills_data:
+    skills_by_name.setdefault(skill.name, skill)
+    
     # 装飾品から検索用辞書作成
-    for deco in skill.get("装飾品", []):
-        deco_name = deco.get("装飾品名", "")
-        if deco_name:
-            deco_to_skill[deco_name] = skill["スキル名"]
+    for deco in skill.decorations:
+        if deco.name:
+            deco_to_skill[deco.name] = skill.name
     
     # 装備から検索用辞書作成
-    for armor in skill.get("装備", []):
-        armor_name = armor.get("防具名", "")
-        if armor_name:
-            armor_to_skill[armor_name] = skill["スキル名"]
+    for armor in skill.armors:
+        if armor.piece.name:
+            armor_to_skill[armor.piece.name] = skill.name
 
-def search_skill(text):
+def find_skill(text):
     """
-    スキル名、装飾品名、または防具名から情報を検索
+    スキル名、装飾品名、または防具名からスキルを探し、(スキル, 検索種別) を返す
     """
-    if not text:
-        return "検索するスキル名、装飾品名、または防具名を入力してください。"
-    
-    # 検索結果
-    result = None
-    search_type = ""
-    
     # スキル名で検索
     for skill in skills_data:
-        if text in skill["スキル名"]:
-            result = skill
-            search_type = "スキル名"
-            break
+        if text in skill.name:
+            return skill, "スキル名"
     
     # スキル名で見つからなければ装飾品名で検索（部分一致）
-    if not result:
-        matching_decos = [deco for deco in deco_to_skill.keys() if text in deco]
-        if matching_decos:
-            deco_name = matching_decos[0]  # 最初の一致した装飾品を使用
-            skill_name = deco_to_skill[deco_name]
-            for skill in skills_data:
-                if skill["スキル名"] == skill_name:
-                    result = skill
-                    search_type = f"装飾品「{deco_name}」"
-                    break
+    matching_decos = [deco for deco in deco_to_skill.keys() if text in deco]
+    if matching_decos:
+        deco_name = matching_decos[0]  # 最初の一致した装飾品を使用
+        return skills_by_name[deco_to_skill[deco_name]], f"装飾品「{deco_name}」"
     
     # 装飾品で見つからなければ装備名で検索（部分一致）
-    if not result:
-        matching_armors = [armor for armor in armor_to_skill.keys() if text in armor]
-        if matching_armors:
-            armor_name = matching_armors[0]  # 最初の一致した防具を使用
-            skill_name = armor_to_skill[armor_name]
-            for skill in skills_data:
-                if skill["スキル名"] == skill_name:
-                    result = skill
-                    search_type = f"装備「{armor_name}」"
-                    break
+    matching_armors = [armor for armor in armor_to_skill.keys() if text in armor]
+    if matching_armors:
+        armor_name = matching_armors[0]  # 最初の一致した防具を使用
+        return skills_by_name[armor_to_skill[armor_name]], f"装備「{armor_name}」"
+    
+    return None, ""
+
+def search_skill(text):
+    """
+    スキル名、装飾品名、または防具名から情報を検索
+    """
+    return lookup_skill(text)[1]
+
+def lookup_skill(text):
+    """
+    スキルを1回だけ検索し、(見つかったスキル または None, 返信テキスト) を返す
+    返信テキストは search_skill と同じ
+    """
+    if not text:
+        return None, "検索するスキル名、装飾品名、または防具名を入力してください。"
+    
+    # 検索結果
+    result, search_type = find_skill(text)
     
     # 検索結果に応じてメッセージを返信
     if result:
         # スキル情報を整形して返信
         reply_text = f"【{search_type}での検索結果】\n"
-        reply_text += f"スキル名: {result['スキル名']}\n\n"
-        reply_text += f"▼効果\n{result['効果']}\n\n"
-        reply_text += f"▼最大レベル: {result['最大レベル']}\n\n"
+        reply_text += f"スキル名: {result.name}\n\n"
+        reply_text += f"▼効果\n{result.effect}\n\n"
+        reply_text += f"▼最大レベル: {result.max_level}\n\n"
         
-        # レベル別効果がある場合
-        if result["レベル別効果"]:
+        # レベル別効果がある場合（読み込み時にレベル順に並べ替え済み）
+        if result.level_effects:
             reply_text += "▼レベル別効果\n"
-            for effect in sorted(result["レベル別効果"], key=lambda x: x["レベル"]):
-                reply_text += f"Lv{effect['レベル']}: {effect['効果']}\n"
+            for effect in result.level_effects:
+                reply_text += f"Lv{effect.level}: {effect.effect}\n"
             reply_text += "\n"
         
         # 装飾品情報がある場合
-        if result["装飾品"]:
+        if result.decorations:
             reply_text += "▼装飾品\n"
-            for deco in result["装飾品"]:
-                reply_text += f"・{deco.get('装飾品名', '')} (Lv{deco.get('装飾品Lv', '')})\n"
+            for deco in result.decorations:
+                reply_text += f"・{deco.name} (Lv{deco.level})\n"
             reply_text += "\n"
         
-        # 装備情報がある場合
-        if "装備" in result and result["装備"]:
-            reply_text += f"▼{result['スキル名']}が発動する装備(レベル/スロット数)\n"
+        # 装備情報がある場合（読み込み時にスキルレベルが高い順に並べ替え済み）
+        if result.armors:
+            reply_text += f"▼{result.name}が発動する装備(レベル/スロット数)\n"
             
-            # スキルレベルが高い順に並べ替え
-            sorted_armors = sorted(result["装備"], key=lambda x: x.get("スキルレベル", 0), reverse=True)
-            for armor in sorted_armors:  # 全ての装備を表示
-                # スロット情報の取得
-                slots = armor.get('スロット', [])
-                
+            for armor in result.armors:  # 全ての装備を表示
                 # スロット情報を含めた表示
-                if slots:
+                if armor.piece.slots:
                     # スロットの数値をそのまま文字列に変換して表示
-                    slot_str = '/'.join(map(str, slots))
-                    reply_text += f"・{armor.get('防具名', '')} (Lv{armor.get('スキルレベル', '')}/{slot_str})\n"
+                    slot_str = '/'.join(map(str, armor.piece.slots))
+                    reply_text += f"・{armor.piece.name} (Lv{armor.skill_level}/{slot_str})\n"
                 else:
-                    reply_text += f"・{armor.get('防具名', '')} (Lv{armor.get('スキルレベル', '')})\n"
+                    reply_text += f"・{armor.piece.name} (Lv{armor.skill_level})\n"
         
-        return reply_text
+        return result, reply_text
     else:
         # 結果が見つからなかった場合
-        return f"ごめんニャ、「{text}」に関する情報が見つかんないニャ。寝不足かもなのニャ…\nスキル名、装飾品名、または防具名を入れてみるニャ！"
+        return None, f"ごめんニャ、「{text}」に関する情報が見つかんないニャ。寝不足かもなのニャ…\nスキル名、装飾品名、または防具名を入れてみるニャ！"
+
+def search_skill_decorations(skill_name):
+    """
+    スキルを発動できる装飾品だけを検索する
+    """
+    result, _ = find_skill(skill_name)
+    if not result:
+        return f"ごめんニャ、「{skill_name}」に関する情報が見つかんないニャ。"
+    
+    if not result.decorations:
+        return f"{result.name}の装飾品はないみたいだニャ。装備で発動させるニャ！"
+    
+    reply_text = f"【{result.name}の装飾品】\n\n"
+    for deco in result.decorations:
+        reply_text += f"・{deco.name} (Lv{deco.level})\n"
+    return reply_text
@@ -0,0 +1,76 @@
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# STARTUP_PROFILE=1 のときだけ起動時間を計測する
+enabled = os.environ.get('STARTUP_PROFILE') == '1'
+
+# 計測結果 [(種類, 名前, 自身の時間, 子を含む時間)]
+records = []
+import_stack = []
+original_import = builtins.__import__
+
+def profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """
+    初回のモジュール読み込みにかかった時間を記録する __import__ の置き換え
+    """
+    if level or name in sys.modules:
+        return original_import(name, globals, locals, fromlist, level)
+    
+    import_stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = import_stack.pop()
+        if import_stack:
+            import_stack[-1] += elapsed
+        records.append(("import", name, elapsed - children, elapsed))
+
+def install():
+    """
+    モジュール読み込み時間の計測を開始する（STARTUP_PROFILE=1 のときのみ）
+    """
+    if enabled and builtins.__import__ is not profiled_import:
+        builtins.__import__ = profiled_import
+
+def uninstall():
+    builtins.__import__ = original_import
+
+@contextmanager
+def stage(name):
+    """
+    初期化処理の時間を記録する
+    """
+    if not enabled:
+        yield
+        return
+    
+    # 計測中の読み込みの内側で呼ばれた場合も、親の時間から差し引けるようにする
+    import_stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        children = import_stack.pop()
+        if import_stack:
+            import_stack[-1] += elapsed
+        records.append(("init", name, elapsed - children, elapsed))
+
+def report(title, limit=25):
+    """
+    記録した時間を自身の時間が長い順に表示し、記録をリセットする
+    """
+    if not enabled or not records:
+        return
+    
+    total = sum(self_time for _, _, self_time, _ in records)
+    print(f"[startup] {title}: 合計 {total * 1000:.1f}ms（{len(records)}件）", file=sys.stderr)
+    print(f"[startup] {'種類':<6}{'自身(ms)':>10}{'合計(ms)':>10}  名前", file=sys.stderr)
+    for kind, name, self_time, cumulative in sorted(records, key=lambda x: x[2], reverse=True)[:limit]:
+        print(f"[startup] {kind:<8}{self_time * 1000:>10.1f}{cumulative * 1000:>10.1f}  {name}", file=sys.stderr)
+    records.clear()
@@ -5,8 +5,14 @@ import os
 # カレントディレクトリをPYTHONPATHに追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# STARTUP_PROFILE=1 のときはモジュールごとの読み込み時間を計測する
+import startup_profile
+startup_profile.install()
+
 # アプリケーションをインポート
 from app import app as application
 
+startup_profile.report("wsgi:app の読み込み")
+
 # Gunicornは'application'という名前の変数も探すので、両方定義しておく
 app = application